@@ -28,14 +28,27 @@ Arguments:
     * **show_hidden** *(bool)*: Force showing hidden files (currently
         supported only on Windows)
     * **on_selection** *(func)*: Callback for fetching the selection.
+    * **stream** *(bool)*: Return an iterator yielding the selected
+        paths as the back-end reports them instead of a list, e.g. for
+        very large selections. The dialog is opened when the iteration
+        starts and `on_selection` isn't called (Linux only).
 
 Important: these methods will return only after user interaction.
 Use threads or you will stop the mainloop if your app has one.
 
+open_file_async, save_file_async and choose_dir_async accept the same
+arguments, but return a :class:`concurrent.futures.Future` of the selection
+immediately. Cancelling the future closes the dialog. In asyncio code
+await it with `asyncio.wrap_future()`.
+
 .. versionchanged:: 1.4.0
     Added Android implementation for open_file()
     Added ``on_selection`` kwarg for callback function
 
+.. versionadded:: 2.2.0
+    Added open_file_async, save_file_async and choose_dir_async (Linux)
+    Added ``stream`` kwarg (Linux)
+
 Supported Plaforms
 ------------------
 Android, iOS, macOS, Linux, Windows
@@ -68,7 +81,28 @@ class FileChooser:
         """
         return self._file_selection_dialog(mode="dir", *args, **kwargs)
 
+    def open_file_async(self, *args, **kwargs):
+        """
+        Open the file chooser in "open" mode without blocking.
+        """
+        return self._file_selection_dialog_async(mode="open", *args, **kwargs)
+
+    def save_file_async(self, *args, **kwargs):
+        """
+        Open the file chooser in "save" mode without blocking.
+        """
+        return self._file_selection_dialog_async(mode="save", *args, **kwargs)
+
+    def choose_dir_async(self, *args, **kwargs):
+        """
+        Open the directory chooser without blocking.
+        """
+        return self._file_selection_dialog_async(mode="dir", *args, **kwargs)
+
     # private
 
     def _file_selection_dialog(self, **kwargs):
         raise NotImplementedError()
+
+    def _file_selection_dialog_async(self, **kwargs):
+        raise NotImplementedError()
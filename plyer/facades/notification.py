@@ -30,6 +30,15 @@ Notification with custom icon::
     >>> from plyer import notification
     >>> notification.notify(title='title', message='hello', app_icon=<path>)
 
+Progress-like notification updated in place::
+
+    >>> from plyer import notification
+    >>> notification.update_rate = 2
+    >>> handle = notification.notify(title='Download', message='0 %')
+    >>> for percent in range(101):
+    ...     notification.update(handle, title='Download',
+    ...                         message='{} %'.format(percent))
+
 .. versionadded:: 1.0.0
 
 .. versionadded:: 1.4.0
@@ -37,16 +46,228 @@ Notification with custom icon::
 
 .. versionchanged:: 1.4.0
    Android implementation now supports custom icons for notifications.
+
+.. versionadded:: 2.2.0
+   Return a handle from notify() and add update() (Linux D-Bus only).
+
+.. versionadded:: 2.2.0
+   Optional background dispatcher, see :meth:`Notification.start_dispatcher`.
+
+.. versionadded:: 2.2.0
+   Rate limiting and deduplication, see :attr:`Notification.rate_limit`.
 '''
 
+import atexit
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from threading import Condition, Lock, Thread, Timer
+from time import monotonic
+
+from plyer.utils import reify
+
+
+class NotificationDispatcher:
+    '''
+    Deliver queued notifications from a background thread.
+
+    The queue holds at most `maxsize` notifications. When it's full,
+    `overflow` decides what to do with a new one:
+
+    * ``'drop_oldest'`` - discard the oldest queued notification
+    * ``'block'`` - wait until there's a free slot in the queue
+    * ``'merge'`` - append the message to a queued notification which
+      differs only in the message, or drop the oldest if there's none
+
+    Up to `batch_size` consecutive queued notifications which differ only
+    in the message are delivered as a single one with their messages
+    joined. Notifications with different actions, callbacks or hints
+    are never merged. Queued notifications are flushed when
+    the interpreter exits.
+
+    .. versionadded:: 2.2.0
+    '''
+
+    OVERFLOW = ('drop_oldest', 'block', 'merge')
+
+    def __init__(self, deliver, maxsize=100, overflow='drop_oldest',
+                 batch_size=1):
+        if overflow not in self.OVERFLOW:
+            raise ValueError('overflow has to be one of {}'.format(
+                ', '.join(self.OVERFLOW)
+            ))
+        self.deliver = deliver
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.dropped = 0
+        '''Number of notifications discarded due to a full queue.
+        '''
+
+        self._queue = deque()
+        self._cond = Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _key(kwargs):
+        # in-place updates are never merged with other notifications
+        if kwargs.get('replaces_id') is not None:
+            return None
+        # compared only for equality, the values needn't be hashable
+        return {
+            name: value for name, value in kwargs.items()
+            if name != 'message'
+        }
+
+    def put(self, kwargs):
+        '''
+        Queue a notification and return a :class:`~concurrent.futures.Future`
+        resolving to its handle.
+        '''
+        with self._cond:
+            if self.overflow == 'block':
+                while len(self._queue) >= self.maxsize and not self._closed:
+                    self._cond.wait()
+            if self._closed:
+                raise RuntimeError('Notification dispatcher is closed.')
+
+            if len(self._queue) >= self.maxsize:
+                merged = self.overflow == 'merge' and self._merge(kwargs)
+                if merged:
+                    return merged
+                _, futures = self._queue.popleft()
+                for future in futures:
+                    future.cancel()
+                self.dropped += 1
+
+            future = Future()
+            self._queue.append((kwargs, [future]))
+            self._cond.notify_all()
+        return future
+
+    def _merge(self, kwargs):
+        key = self._key(kwargs)
+        if key is None:
+            return None
+        for queued, futures in reversed(self._queue):
+            if self._key(queued) == key:
+                queued['message'] = '{}\n{}'.format(
+                    queued.get('message', ''), kwargs.get('message', '')
+                )
+                future = Future()
+                futures.append(future)
+                return future
+        return None
+
+    def _take_batch(self):
+        # merge consecutive notifications differing only in the message
+        kwargs, futures = self._queue.popleft()
+        kwargs = dict(kwargs)
+        key = self._key(kwargs)
+        count = 1
+        while (self._queue and count < self.batch_size and
+               key is not None and self._key(self._queue[0][0]) == key):
+            queued, more = self._queue.popleft()
+            kwargs['message'] = '{}\n{}'.format(
+                kwargs.get('message', ''), queued.get('message', '')
+            )
+            futures = futures + more
+            count += 1
+        return kwargs, futures
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                kwargs, futures = self._take_batch()
+                self._busy = True
+                self._cond.notify_all()
+
+            futures = [
+                future for future in futures
+                if future.set_running_or_notify_cancel()
+            ]
+            if futures:
+                self._dispatch(kwargs, futures)
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _dispatch(self, kwargs, futures):
+        handle = kwargs.get('replaces_id')
+        try:
+            if isinstance(handle, Future):
+                # handle of a notification queued earlier
+                kwargs['replaces_id'] = handle.result()
+            result = self.deliver(**kwargs)
+        except Exception as exc:
+            for future in futures:
+                future.set_exception(exc)
+        else:
+            for future in futures:
+                future.set_result(result)
+
+    def flush(self, timeout=None):
+        '''
+        Wait until all the queued notifications are delivered.
+        Returns False on timeout.
+        '''
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._queue and not self._busy, timeout
+            )
+
+    def close(self, timeout=None):
+        '''
+        Deliver the queued notifications and stop the dispatcher thread.
+        '''
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
 
 class Notification:
     '''
     Notification facade.
     '''
 
+    update_rate = 0
+    '''Maximum number of updates per second sent for a single notification
+    by :meth:`update`. Updates arriving faster are collapsed into the latest
+    one, which is sent once the interval elapses. 0 disables coalescing.
+    '''
+
+    rate_limit = 0
+    '''Number of notifications per second allowed for each pair of app name
+    and title by :meth:`notify`, the others are dropped. 0 disables
+    the limit.
+    '''
+
+    rate_burst = 10
+    '''Number of notifications allowed at once before :attr:`rate_limit`
+    applies.
+    '''
+
+    dedup_window = 0
+    '''Number of seconds during which a notification with the same app name,
+    title and message as an already shown one is dropped by :meth:`notify`.
+    0 disables deduplication.
+    '''
+
+    _dispatcher = None
+
     def notify(self, title='', message='', app_name='', app_icon='',
-               timeout=10, ticker='', toast=False, hints={}):
+               timeout=10, ticker='', toast=False, hints={}, actions=None,
+               on_action=None, on_close=None):
         '''
         Send a notification.
 
@@ -61,6 +282,11 @@ class Notification:
         :param hints: Optional hints that can be used to pass along extra
                       instructions on Linux.
                       (See https://specifications.freedesktop.org/notification-spec/latest/ar01s08.html)  # noqa: E501
+        :param actions: list of ``(key, label)`` pairs shown as buttons
+        :param on_action: called as ``on_action(handle, key)`` when
+                          an action is invoked
+        :param on_close: called as ``on_close(handle, reason)`` when
+                         the notification is closed
 
         :type title: str
         :type message: str
@@ -70,24 +296,224 @@ class Notification:
         :type ticker: str
         :type toast: bool
         :type hints: dict
+        :type actions: list
+        :type on_action: callable
+        :type on_close: callable
 
         .. note::
            When called on Windows, ``app_icon`` has to be a path to
            a file in .ICO format.
 
+        .. note::
+           On Linux the callbacks are called from a background thread
+           shared by all notifications.
+
         .. versionadded:: 1.0.0
 
         .. versionchanged:: 1.4.0
            Add 'toast' keyword argument
+
+        .. versionchanged:: 2.2.0
+           Return a handle of the notification for :meth:`update`,
+           or None if the platform doesn't provide one. With a running
+           dispatcher a :class:`~concurrent.futures.Future` resolving
+           to the handle is returned instead.
+
+        .. versionchanged:: 2.2.0
+           Add 'actions', 'on_action' and 'on_close' keyword arguments
+           (Linux D-Bus only).
+
+        .. versionchanged:: 2.2.0
+           Return None without showing the notification if it's dropped
+           due to :attr:`rate_limit` or :attr:`dedup_window`.
+        '''
+
+        if (self.rate_limit or self.dedup_window) and \
+                self._suppress(app_name, title, message):
+            return None
+
+        return self._deliver(dict(
+            title=title, message=message,
+            app_icon=app_icon, app_name=app_name,
+            timeout=timeout, ticker=ticker, toast=toast, hints=hints,
+            actions=actions, on_action=on_action, on_close=on_close
+        ))
+
+    def update(self, handle, title='', message='', app_name='', app_icon='',
+               timeout=10, hints={}):
         '''
+        Replace the content of a notification shown by :meth:`notify`
+        instead of showing a new one. See :attr:`update_rate` to limit
+        the number of updates sent to the notification server.
+
+        :param handle: handle returned by :meth:`notify`
+
+        Other parameters are the same as for :meth:`notify`.
 
-        self._notify(
+        .. versionadded:: 2.2.0
+        '''
+        kwargs = dict(
             title=title, message=message,
             app_icon=app_icon, app_name=app_name,
-            timeout=timeout, ticker=ticker, toast=toast, hints=hints
+            timeout=timeout, hints=hints, replaces_id=handle
         )
+        if not self.update_rate or handle is None:
+            return self._deliver(kwargs)
+        return self._coalesce_update(handle, kwargs)
+
+    @property
+    def suppressed(self):
+        '''
+        :class:`~collections.Counter` of notifications dropped due to
+        :attr:`rate_limit` or :attr:`dedup_window` by app name and title.
+
+        .. versionadded:: 2.2.0
+        '''
+        with self._limits['lock']:
+            return Counter(self._limits['suppressed'])
+
+    def close(self, handle):
+        '''
+        Remove a notification shown by :meth:`notify`.
+
+        .. versionadded:: 2.2.0
+        '''
+        if isinstance(handle, Future):
+            handle = handle.result()
+        self._close(handle)
+
+    def start_dispatcher(self, maxsize=100, overflow='drop_oldest',
+                         batch_size=1):
+        '''
+        Deliver notifications from a background thread, so that
+        :meth:`notify` and :meth:`update` don't block the caller.
+        See :class:`NotificationDispatcher` for the parameters.
+
+        .. versionadded:: 2.2.0
+        '''
+        self.stop_dispatcher()
+        self._dispatcher = NotificationDispatcher(
+            self._notify, maxsize=maxsize, overflow=overflow,
+            batch_size=batch_size
+        )
+        return self._dispatcher
+
+    def stop_dispatcher(self, timeout=None):
+        '''
+        Deliver the queued notifications and go back to delivering
+        them on the caller's thread.
+
+        .. versionadded:: 2.2.0
+        '''
+        dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None:
+            dispatcher.close(timeout)
 
     # private
 
+    @reify
+    def _limits(self):
+        return {
+            'lock': Lock(),
+            # (app_name, title): (tokens, time of the last refill),
+            # least recently used first
+            'buckets': OrderedDict(),
+            # (app_name, title, message): time the content was first shown
+            'recent': OrderedDict(),
+            'suppressed': Counter()
+        }
+
+    def _refill(self, bucket, now):
+        tokens, last = bucket
+        return min(self.rate_burst, tokens + (now - last) * self.rate_limit)
+
+    def _suppress(self, app_name, title, message):
+        '''
+        Check the limits and return True if a notification has to be dropped.
+        '''
+        limits = self._limits
+        key = (app_name, title)
+        content = (app_name, title, message)
+        now = monotonic()
+
+        with limits['lock']:
+            recent = limits['recent']
+            if self.dedup_window:
+                while recent and next(iter(recent.values())) <= \
+                        now - self.dedup_window:
+                    recent.popitem(last=False)
+                if content in recent:
+                    limits['suppressed'][key] += 1
+                    return True
+
+            if self.rate_limit:
+                buckets = limits['buckets']
+                tokens = self._refill(
+                    buckets.pop(key, (self.rate_burst, now)), now
+                )
+                # a full bucket is the same as a missing one
+                while buckets and self._refill(
+                        next(iter(buckets.values())), now) >= self.rate_burst:
+                    buckets.popitem(last=False)
+                if tokens < 1:
+                    buckets[key] = (tokens, now)
+                    limits['suppressed'][key] += 1
+                    return True
+                buckets[key] = (tokens - 1, now)
+
+            if self.dedup_window:
+                recent[content] = now
+        return False
+
+    def _deliver(self, kwargs):
+        if self._dispatcher is not None:
+            return self._dispatcher.put(kwargs)
+        return self._notify(**kwargs)
+
+    @reify
+    def _updates(self):
+        # handle: (time of the last sent update, pending update or None)
+        return {}, Lock()
+
+    def _coalesce_update(self, handle, kwargs):
+        updates, lock = self._updates
+        interval = 1.0 / self.update_rate
+
+        with lock:
+            now = monotonic()
+            last, pending = updates.get(handle, (None, None))
+            if pending is not None:
+                # flush is already scheduled, send the latest content
+                updates[handle] = (last, kwargs)
+                return handle
+
+            wait = 0 if last is None else last + interval - now
+            if wait > 0:
+                updates[handle] = (last, kwargs)
+                timer = Timer(wait, self._flush_update, args=(handle, ))
+                timer.daemon = True
+                timer.start()
+                return handle
+
+            # forget the handles with no updates for a while
+            for old in [
+                    key for key, (sent, pending) in updates.items()
+                    if pending is None and now - sent > interval]:
+                del updates[old]
+            updates[handle] = (now, None)
+
+        self._deliver(kwargs)
+        return handle
+
+    def _flush_update(self, handle):
+        updates, lock = self._updates
+        with lock:
+            kwargs = updates[handle][1]
+            updates[handle] = (monotonic(), None)
+        self._deliver(kwargs)
+
     def _notify(self, **kwargs):
         raise NotImplementedError("No usable implementation found!")
+
+    def _close(self, handle):
+        raise NotImplementedError()
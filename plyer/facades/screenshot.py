@@ -23,6 +23,31 @@ To take screenshot::
 
     >>> from plyer import screenshot
     >>> screenshot.capture()
+
+To take screenshot without writing it to a file::
+
+    >>> data = screenshot.capture_to_buffer()
+
+To capture a region of the screen continuously, skipping the frames
+in which nothing changed::
+
+    >>> stream = screenshot.capture_stream(fps=30, region=(0, 0, 640, 480))
+    >>> for frame in stream:
+    ...     process(frame)
+    >>> stream.close()
+
+To compress the frames to PNG on a pool of threads::
+
+    >>> stream = screenshot.capture_png_stream(fps=30, max_pending=8)
+    >>> for frame in stream:
+    ...     save(frame.index, frame.data)
+    >>> stream.dropped
+    0
+
+.. versionadded:: 2.2.0
+    Added capture_to_buffer(), capture_stream() and capture_png_stream()
+    (Linux), the default file path is looked up on the first access
+    of file_path.
 '''
 
 
@@ -39,8 +64,42 @@ class Screenshot:
     def capture(self):
         self._capture()
 
+    def capture_to_buffer(self):
+        '''
+        Take a screenshot and return the image data as a bytes-like object,
+        in the format the platform writes to `file_path`.
+        '''
+        return self._capture_to_buffer()
+
+    def capture_stream(self, fps=10, region=None, monitor=None):
+        '''
+        Capture the screen at most `fps` times per second and return
+        an iterable of the frames which differ from the previous one.
+
+        :param region: `(x, y, width, height)` rectangle to capture,
+            relative to the monitor if one is selected.
+        :param monitor: index or name of a single monitor to capture.
+        '''
+        return self._capture_stream(fps=fps, region=region, monitor=monitor)
+
+    def capture_png_stream(self, fps=10, region=None, monitor=None,
+                           workers=None, max_pending=None, level=6,
+                           block=False):
+        '''
+        Same as :meth:`capture_stream`, but the frames are encoded to PNG
+        by `workers` threads and yielded in order. If `max_pending` frames
+        are being encoded, new frames are dropped and counted, or if `block`
+        is True the capture waits for the oldest one to be encoded.
+        '''
+        return self._capture_png_stream(
+            fps=fps, region=region, monitor=monitor, workers=workers,
+            max_pending=max_pending, level=level, block=block
+        )
+
     @property
     def file_path(self):
+        if not self._file_path:
+            self._file_path = self._default_file_path()
         return self._file_path
 
     @file_path.setter
@@ -55,3 +114,15 @@ class Screenshot:
 
     def _capture(self, **kwargs):
         raise NotImplementedError()
+
+    def _capture_to_buffer(self, **kwargs):
+        raise NotImplementedError()
+
+    def _capture_stream(self, **kwargs):
+        raise NotImplementedError()
+
+    def _capture_png_stream(self, **kwargs):
+        raise NotImplementedError()
+
+    def _default_file_path(self):
+        return ''
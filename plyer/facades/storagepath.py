@@ -27,6 +27,22 @@ To get the path of directory holding application files::
     >>> from plyer import storagepath
     >>> storagepath.get_application_dir()
 
+To get the paths of all the standard user directories at once::
+
+    >>> from plyer import storagepath
+    >>> storagepath.get_all_dirs()['pictures']
+
+To choose a cache directory with enough free space::
+
+    >>> from plyer import storagepath
+    >>> cache = storagepath.get_cache_dir()
+    >>> storagepath.get_capacity(cache)['available']
+
+To get the space taken by the downloaded files::
+
+    >>> from plyer import storagepath
+    >>> storagepath.usage(storagepath.get_downloads_dir())['disk_usage']
+
 '''
 
 
@@ -102,6 +118,93 @@ class StoragePath:
         '''
         return self._get_application_dir()
 
+    def get_all_dirs(self):
+        '''
+        Get a dict of the paths of the standard user directories,
+        e.g. ``documents``, ``download``, ``music``, ``pictures``.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_all_dirs()
+
+    def get_cache_dir(self):
+        '''
+        Get the path of the directory for non-essential cached data
+        of the user.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_cache_dir()
+
+    def get_config_dir(self):
+        '''
+        Get the path of the directory for configuration files of the user.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_config_dir()
+
+    def get_data_dir(self):
+        '''
+        Get the path of the directory for data files of the user.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_data_dir()
+
+    def get_state_dir(self):
+        '''
+        Get the path of the directory for state data, such as logs
+        or history, which should persist between restarts.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_state_dir()
+
+    def get_runtime_dir(self):
+        '''
+        Get the path of the directory for runtime files such as sockets,
+        or None if there's none.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_runtime_dir()
+
+    def get_capacity(self, path):
+        '''
+        Get the space of the filesystem holding `path` in bytes, as a dict
+        with the ``total``, ``free`` and ``available`` (to the user) space.
+        The result may be cached for a few seconds.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_capacity(path)
+
+    def get_removable_volumes(self):
+        '''
+        Get a list of the mounted removable volumes, such as USB drives
+        or SD cards, as dicts with the mount ``path``, the ``device``,
+        the ``fstype`` and whether it's ``read_only``.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._get_removable_volumes()
+
+    def usage(self, path, progress=None):
+        '''
+        Get the space taken by the directory tree of `path` as a dict of
+        the ``size`` of the files and their ``disk_usage`` in bytes, the
+        number of ``files`` and ``dirs``, and of the directories which
+        couldn't be read (``errors``). Hard links are counted once.
+
+        `progress` is called with the partial dict during the scan.
+        Scanning a tree again is faster, as unchanged directories
+        aren't read again.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._usage(path, progress=progress)
+
     # private
 
     def _get_home_dir(self):
@@ -133,3 +236,30 @@ class StoragePath:
 
     def _get_application_dir(self):
         raise NotImplementedError()
+
+    def _get_all_dirs(self):
+        raise NotImplementedError()
+
+    def _get_cache_dir(self):
+        raise NotImplementedError()
+
+    def _get_config_dir(self):
+        raise NotImplementedError()
+
+    def _get_data_dir(self):
+        raise NotImplementedError()
+
+    def _get_state_dir(self):
+        raise NotImplementedError()
+
+    def _get_runtime_dir(self):
+        raise NotImplementedError()
+
+    def _get_capacity(self, path):
+        raise NotImplementedError()
+
+    def _get_removable_volumes(self):
+        raise NotImplementedError()
+
+    def _usage(self, path, **kwargs):
+        raise NotImplementedError()
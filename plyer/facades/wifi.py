@@ -60,6 +60,14 @@ To get available wifi networks::
 
 This returns all the available wifi networks near the device.
 
+To scan without blocking the caller::
+
+    >>> from plyer import wifi
+    >>> future = wifi.start_scanning_async(callback=print)
+    >>> networks = future.result()
+
+Callers asking for a scan while another one is in flight share its result.
+
 Supported Platforms
 -------------------
 Windows, OS X, Linux
@@ -114,9 +122,36 @@ class Wifi:
     def start_scanning(self, interface=None):
         '''
         Turn on scanning.
+
+        .. versionchanged:: 2.2.0
+           On Linux, `interface` can be ``'all'`` to scan with all
+           the WiFi interfaces at once.
         '''
         return self._start_scanning(interface=interface)
 
+    def start_scanning_async(self, interface=None, callback=None):
+        '''
+        Scan in the background and return a
+        :class:`concurrent.futures.Future` resolving to a dictionary
+        of the found networks. If `callback` is set, it's called with
+        the finished future.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._start_scanning_async(
+            interface=interface, callback=callback
+        )
+
+    def monitor_link(self, interface=None, rate=1.0, size=60):
+        '''
+        Start sampling signal quality of the connected link `rate` times
+        per second without scanning. Returns a monitor object keeping
+        the last `size` samples, see the platform implementation.
+
+        .. versionadded:: 2.2.0
+        '''
+        return self._monitor_link(interface=interface, rate=rate, size=size)
+
     def get_network_info(self, name):
         '''
         Return a dictionary of specified network.
@@ -168,6 +203,12 @@ class Wifi:
     def _start_scanning(self, interface=None):
         raise NotImplementedError()
 
+    def _start_scanning_async(self, interface=None, callback=None):
+        raise NotImplementedError()
+
+    def _monitor_link(self, **kwargs):
+        raise NotImplementedError()
+
     def _get_network_info(self, **kwargs):
         raise NotImplementedError()
 
@@ -4,10 +4,26 @@ Linux file chooser
 '''
 
 from plyer.facades import FileChooser
-from distutils.spawn import find_executable as which
+from plyer.platforms.linux.libs.session_bus import (
+    SessionBusProxy, SignalListener
+)
+from plyer.utils import whereis_exe, module_available
+from concurrent.futures import Future
+from functools import lru_cache
+from itertools import count
+from threading import Lock, Thread
+from urllib.parse import unquote, urlparse
+import codecs
 import os
 import subprocess as sp
-import time
+
+
+@lru_cache(maxsize=None)
+def which(executable):
+    '''Cached lookup of a back-end executable on the PATH, cleared by
+    :meth:`LinuxFileChooser.refresh_desktop`.
+    '''
+    return whereis_exe(executable)
 
 
 class SubprocessFileChooser:
@@ -15,6 +31,10 @@ class SubprocessFileChooser:
     subprocess back-ends.
     Normally you only need to override _gen_cmdline, executable,
     separator and successretcode.
+
+    .. versionchanged:: 2.2.0
+       The output is split while it's read, override _iter_paths instead
+       of _split_output for custom splitting.
     '''
 
     executable = ""
@@ -23,7 +43,7 @@ class SubprocessFileChooser:
 
     separator = "|"
     '''The separator used by the back-end. Override this for automatic
-    splitting, or override _split_output.
+    splitting, or override _iter_paths.
     '''
 
     successretcode = 0
@@ -43,6 +63,7 @@ class SubprocessFileChooser:
         self._handle_selection = kwargs.pop(
             'on_selection', self._handle_selection
         )
+        self._lock = Lock()
 
         # Simulate Kivy's behavior
         for i in kwargs:
@@ -56,31 +77,64 @@ class SubprocessFileChooser:
         return selection
 
     _process = None
+    _cancelled = False
 
     def _run_command(self, cmd):
-        self._process = sp.Popen(cmd, stdout=sp.PIPE)
-        while True:
-            ret = self._process.poll()
-            if ret is not None:
-                if ret == self.successretcode:
-                    out = self._process.communicate()[0].strip().decode('utf8')
-                    return self._set_and_return_selection(
-                        self._split_output(out))
-                else:
-                    return self._set_and_return_selection(None)
-            time.sleep(0.1)
+        selection = list(self._iter_command(cmd))
+        if self._succeeded():
+            return self._set_and_return_selection(selection)
+        return self._set_and_return_selection(None)
+
+    def _succeeded(self):
+        return (
+            self._process is not None and not self._cancelled
+            and self._process.returncode == self.successretcode
+        )
+
+    def _iter_command(self, cmd):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._process = sp.Popen(cmd, stdout=sp.PIPE)
+
+        with self._process:
+            # block on the pipe until the dialog is closed
+            yield from self._iter_paths(self._iter_output())
+            self._process.wait()
+
+    def _iter_paths(self, chunks):
+        '''This method receives the output of the back-end in chunks and
+        turns it into paths, a path can span several chunks.
+        '''
+        pending = ''
+        for chunk in chunks:
+            *paths, pending = (pending + chunk).split(self.separator)
+            yield from filter(None, paths)
+        pending = pending.rstrip('\n')
+        if pending:
+            yield pending
+
+    def _iter_output(self, size=65536):
+        '''Yield decoded chunks of the back-end output as they arrive.
+        '''
+        decoder = codecs.getincrementaldecoder('utf8')()
+        for chunk in iter(lambda: self._process.stdout.read1(size), b''):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+
+    def terminate(self):
+        '''Close the dialog without a selection.
+        '''
+        with self._lock:
+            self._cancelled = True
+            if self._process is not None and self._process.poll() is None:
+                self._process.terminate()
 
     def _set_and_return_selection(self, value):
         self.selection = value
         self._handle_selection(value)
         return value
 
-    def _split_output(self, out):
-        '''This methods receives the output of the back-end and turns
-        it into a list of paths.
-        '''
-        return out.split(self.separator)
-
     def _gen_cmdline(self):
         '''Returns the command line of the back-end, based on the current
         properties. You need to override this.
@@ -90,6 +144,61 @@ class SubprocessFileChooser:
     def run(self):
         return self._run_command(self._gen_cmdline())
 
+    def iter_selection(self):
+        '''Open the dialog and yield the selected paths as the back-end
+        prints them, without collecting the selection. `on_selection`
+        isn't called.
+        '''
+        yield from self._iter_command(self._gen_cmdline())
+
+    def run_async(self):
+        '''Run the dialog in a background thread and return
+        a :class:`ChooserFuture` resolving to the selection.
+        '''
+        future = ChooserFuture(self)
+        Thread(target=self._run_future, args=(future, ), daemon=True).start()
+        return future
+
+    def _run_future(self, future):
+        try:
+            result = self.run()
+        except Exception as exc:
+            result, error = None, exc
+        else:
+            error = None
+
+        future.resolve(result, error)
+
+
+class ChooserFuture(Future):
+    '''A :class:`~concurrent.futures.Future` of a file chooser dialog,
+    cancelling it closes the dialog.
+    '''
+
+    def __init__(self, chooser):
+        super().__init__()
+        self.chooser = chooser
+
+    def cancel(self):
+        if not super().cancel():
+            return False
+        self.chooser.terminate()
+        return True
+
+    def resolve(self, result=None, error=None):
+        '''Set the result or the exception, unless the future
+        was cancelled in the meantime.
+        '''
+        # Python 3.7 doesn't check the state in set_result(), hold the
+        # condition cancel() takes so that it can't land in between
+        with self._condition:
+            if self.done():
+                return
+            if error is not None:
+                self.set_exception(error)
+            else:
+                self.set_result(result)
+
 
 class ZenityFileChooser(SubprocessFileChooser):
     '''A FileChooser implementation using Zenity (on GNU/Linux).
@@ -100,13 +209,14 @@ class ZenityFileChooser(SubprocessFileChooser):
     '''
 
     executable = "zenity"
-    separator = "|"
+    separator = "\n"
     successretcode = 0
 
     def _gen_cmdline(self):
         cmdline = [
             which(self.executable),
-            "--file-selection"
+            "--file-selection",
+            "--separator", self.separator
         ]
         if self.multiple:
             cmdline += ["--multiple"]
@@ -220,10 +330,223 @@ class YADFileChooser(SubprocessFileChooser):
         return cmdline
 
 
+class PortalFileChooser:
+    '''A FileChooser implementation using the FileChooser portal of
+    xdg-desktop-portal, which is available in Flatpak sandboxes too.
+
+    The portal is called on the connection of the shared
+    :class:`SignalListener`, as the response is sent only to the caller.
+    Requires dbus-python and PyGObject.
+
+    Not implemented features:
+    * show_hidden
+    * preview
+    * icon
+
+    .. versionadded:: 2.2.0
+    '''
+
+    bus_name = 'org.freedesktop.portal.Desktop'
+    object_path = '/org/freedesktop/portal/desktop'
+    interface_name = 'org.freedesktop.portal.FileChooser'
+    request_interface = 'org.freedesktop.portal.Request'
+
+    path = None
+    multiple = False
+    filters = []
+    preview = False
+    title = None
+    icon = None
+    show_hidden = False
+
+    _proxy = None
+    _proxy_lock = Lock()
+    _tokens = count(1)
+
+    def __init__(self, *args, **kwargs):
+        self._handle_selection = kwargs.pop(
+            'on_selection', self._handle_selection
+        )
+        self._lock = Lock()
+        self._future = None
+        self._request = None
+        self._matches = []
+        self._cancelled = False
+        self._done = False
+
+        for i in kwargs:
+            setattr(self, i, kwargs[i])
+
+    @staticmethod
+    def _handle_selection(selection):
+        return selection
+
+    @classmethod
+    def _get_proxy(cls):
+        with cls._proxy_lock:
+            if PortalFileChooser._proxy is None:
+                PortalFileChooser._proxy = SessionBusProxy(
+                    cls.bus_name, cls.object_path, cls.interface_name,
+                    bus=SignalListener.instance().bus
+                )
+            return PortalFileChooser._proxy
+
+    def _options(self, token):
+        import dbus
+
+        options = dbus.Dictionary({
+            'handle_token': dbus.String(token, variant_level=1)
+        }, signature='sv')
+        if self.mode != "save":
+            options['multiple'] = dbus.Boolean(
+                self.multiple, variant_level=1
+            )
+            options['directory'] = dbus.Boolean(
+                self.mode == "dir", variant_level=1
+            )
+
+        filters = []
+        for f in self.filters:
+            name, patterns = (f, [f]) if isinstance(f, str) else (f[0], f[1:])
+            filters.append(dbus.Struct((name, dbus.Array([
+                dbus.Struct((dbus.UInt32(0), pattern), signature='us')
+                for pattern in patterns
+            ], signature='(us)')), signature='sa(us)'))
+        if filters:
+            options['filters'] = dbus.Array(
+                filters, signature='(sa(us))', variant_level=1
+            )
+
+        if self.path:
+            folder, name = self.path, None
+            if not os.path.isdir(self.path):
+                folder, name = os.path.split(self.path)
+            if name and self.mode == "save":
+                options['current_name'] = dbus.String(name, variant_level=1)
+            if folder:
+                # a NUL terminated byte string
+                options['current_folder'] = dbus.ByteArray(
+                    os.fsencode(folder) + b'\0', variant_level=1
+                )
+        return options
+
+    def _subscribe(self, path):
+        match = SignalListener.instance().connect(
+            self.request_interface, 'Response', self._response, path=path
+        )
+        with self._lock:
+            self._matches.append(match)
+            done = self._done
+        if done:
+            self._finish(None)
+
+    def _open(self):
+        import dbus
+        try:
+            self._open_dialog()
+        except dbus.exceptions.DBusException as exc:
+            raise OSError(
+                'The file chooser portal is not available: {}'.format(exc)
+            ) from exc
+
+    def _open_dialog(self):
+        proxy = self._get_proxy()
+        token = 'plyer{}_{}'.format(os.getpid(), next(self._tokens))
+        sender = proxy.bus.get_unique_name()[1:].replace('.', '_')
+
+        # subscribe before the call, the response can arrive before
+        # the call returns
+        path = '/org/freedesktop/portal/desktop/request/{}/{}'.format(
+            sender, token
+        )
+        self._subscribe(path)
+
+        method = 'SaveFile' if self.mode == "save" else 'OpenFile'
+        request = str(proxy.call(
+            method, '', self.title or '', self._options(token)
+        ))
+        if request != path:
+            # portals older than 0.9 ignore handle_token
+            self._subscribe(request)
+
+        with self._lock:
+            self._request = request
+            cancelled = self._cancelled
+        if cancelled:
+            self._close_request(request)
+
+    def _close_request(self, path):
+        import dbus
+        bus = self._get_proxy().bus
+        try:
+            dbus.Interface(
+                bus.get_object(self.bus_name, path, introspect=False),
+                self.request_interface
+            ).Close()
+        except dbus.exceptions.DBusException:
+            # the dialog is already closed
+            pass
+
+    def _response(self, response, results):
+        selection = None
+        if response == 0:
+            selection = [
+                unquote(urlparse(str(uri)).path)
+                for uri in results.get('uris', [])
+            ]
+        self._finish(selection)
+
+    def _finish(self, selection, error=None):
+        with self._lock:
+            matches, self._matches = self._matches, []
+            done, self._done = self._done, True
+            future = self._future
+        for match in matches:
+            match.remove()
+        if done:
+            return
+
+        if error is None:
+            self.selection = selection
+            self._handle_selection(selection)
+        future.resolve(selection, error)
+
+    def terminate(self):
+        '''Close the dialog without a selection.
+        '''
+        with self._lock:
+            self._cancelled = True
+            request = self._request
+        if request is not None:
+            self._close_request(request)
+        self._finish(None)
+
+    def run(self):
+        return self.run_async().result()
+
+    def iter_selection(self):
+        '''Open the dialog and yield the selected paths. The portal
+        sends the whole selection at once.
+        '''
+        yield from self.run() or ()
+
+    def run_async(self):
+        '''Open the dialog and return a :class:`ChooserFuture`
+        resolving to the selection.
+        '''
+        self._future = ChooserFuture(self)
+        try:
+            self._open()
+        except Exception as exc:
+            self._finish(None, error=exc)
+        return self._future
+
+
 CHOOSERS = {
     "gnome": ZenityFileChooser,
     "kde": KDialogFileChooser,
-    "yad": YADFileChooser
+    "yad": YADFileChooser,
+    "portal": PortalFileChooser
 }
 
 
@@ -231,24 +554,76 @@ class LinuxFileChooser(FileChooser):
     '''FileChooser implementation for GNu/Linux. Accepts one additional
     keyword argument, *desktop_override*, which, if set, overrides the
     back-end that will be used. Set it to "gnome" for Zenity, to "kde"
-    for KDialog and to "yad" for YAD (Yet Another Dialog).
+    for KDialog, to "yad" for YAD (Yet Another Dialog) and to "portal"
+    for xdg-desktop-portal.
     If set to None or not set, a default one will be picked based on
-    the running desktop environment and installed back-ends.
+    the running desktop environment and installed back-ends. The portal
+    is preferred in a Flatpak sandbox and used when no other back-end
+    is installed, if the org.freedesktop.portal.Desktop service is
+    running or can be started on the session bus.
     '''
 
-    desktop = None
-    if (str(os.environ.get("XDG_CURRENT_DESKTOP")).lower() == "kde"
-            and which("kdialog")):
-        desktop = "kde"
-    elif (str(os.environ.get("DESKTOP_SESSION")).lower() == "trinity"
-            and which('kdialog')):
-        desktop = "kde"
-    elif which("yad"):
-        desktop = "yad"
-    elif which("zenity"):
-        desktop = "gnome"
-
-    def _file_selection_dialog(self, desktop_override=desktop, **kwargs):
+    _desktop = None
+    _detected = False
+
+    @property
+    def desktop(self):
+        '''The back-end picked for this system, detected on first use.
+        '''
+        if not LinuxFileChooser._detected:
+            LinuxFileChooser._desktop = self._detect_desktop()
+            LinuxFileChooser._detected = True
+        return LinuxFileChooser._desktop
+
+    @classmethod
+    def refresh_desktop(cls):
+        '''Forget the detected back-end and the executable paths, e.g.
+        after installing a back-end or changing the PATH.
+        '''
+        which.cache_clear()
+        LinuxFileChooser._detected = False
+        LinuxFileChooser._desktop = None
+
+    @staticmethod
+    def _portal_available():
+        if not (module_available('dbus') and module_available('gi')):
+            return False
+        import dbus
+        name = PortalFileChooser.bus_name
+        try:
+            bus = dbus.SessionBus(private=True)
+        except dbus.exceptions.DBusException:
+            # no session bus
+            return False
+        try:
+            # xdg-desktop-portal is usually started on the first call
+            return bool(bus.name_has_owner(name)) or \
+                name in bus.list_activatable_names()
+        except dbus.exceptions.DBusException:
+            return False
+        finally:
+            bus.close()
+
+    @classmethod
+    def _detect_desktop(cls):
+        environ = os.environ
+        if os.path.exists('/.flatpak-info') and cls._portal_available():
+            return "portal"
+        if (environ.get("XDG_CURRENT_DESKTOP", "").lower() == "kde"
+                and which("kdialog")):
+            return "kde"
+        if (environ.get("DESKTOP_SESSION", "").lower() == "trinity"
+                and which("kdialog")):
+            return "kde"
+        if which("yad"):
+            return "yad"
+        if which("zenity"):
+            return "gnome"
+        if cls._portal_available():
+            return "portal"
+        return None
+
+    def _get_chooser(self, desktop_override=None, **kwargs):
         if not desktop_override:
             desktop_override = self.desktop
         # This means we couldn't find any back-end
@@ -256,8 +631,17 @@ class LinuxFileChooser(FileChooser):
             raise OSError("No back-end available. Please install one.")
 
         chooser = CHOOSERS[desktop_override]
-        c = chooser(**kwargs)
-        return c.run()
+        return chooser(**kwargs)
+
+    def _file_selection_dialog(self, desktop_override=None, stream=False,
+                               **kwargs):
+        chooser = self._get_chooser(desktop_override, **kwargs)
+        if stream:
+            return chooser.iter_selection()
+        return chooser.run()
+
+    def _file_selection_dialog_async(self, desktop_override=None, **kwargs):
+        return self._get_chooser(desktop_override, **kwargs).run_async()
 
 
 def instance():
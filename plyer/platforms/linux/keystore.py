@@ -1,19 +1,21 @@
-try:
-    import keyring
-except ImportError:
-    raise NotImplementedError()
-
 from plyer.facades import Keystore
+from plyer.utils import module_available
 
 
 class LinuxKeystore(Keystore):
 
     def _set_key(self, servicename, key, value, **kwargs):
+        import keyring
         keyring.set_password(servicename, key, value)
 
     def _get_key(self, servicename, key, **kwargs):
+        import keyring
         return keyring.get_password(servicename, key)
 
 
 def instance():
-    return LinuxKeystore()
+    # keyring scans entry points for its backends on import,
+    # load it only when a key is accessed
+    if module_available('keyring'):
+        return LinuxKeystore()
+    return Keystore()
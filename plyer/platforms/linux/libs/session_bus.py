@@ -0,0 +1,151 @@
+'''
+Helpers for talking to services on the D-Bus session bus
+with dbus-python, shared by the Linux platform modules.
+'''
+
+__all__ = ('SessionBusProxy', 'SignalListener')
+
+from threading import Lock, Thread
+
+
+class SessionBusProxy:
+    '''
+    Lazily connected proxy of an object on the session bus.
+
+    The connection is private to the proxy and together with the proxy
+    object it's created on the first call, then reused for all the other
+    calls. If the connection or the service goes away, the proxy
+    reconnects and retries the call once.
+
+    An already open connection can be passed as `bus` instead, e.g. the one
+    of :class:`SignalListener` for services which send their signals only
+    to the caller. Such connection is never closed by the proxy.
+    '''
+
+    def __init__(self, bus_name, object_path, interface_name, bus=None):
+        self.bus_name = bus_name
+        self.object_path = object_path
+        self.interface_name = interface_name
+        self._shared_bus = bus
+        self._bus = None
+        self._interface = None
+        self._lock = Lock()
+
+    @property
+    def bus(self):
+        '''
+        Connection to the session bus, connect if there's none yet.
+        '''
+        return self._connect()[0]
+
+    def _connect(self):
+        with self._lock:
+            if self._interface is None:
+                import dbus
+                self._bus = self._shared_bus or dbus.SessionBus(private=True)
+                # introspected once, dbus-python takes the argument
+                # types of the calls from it
+                obj = self._bus.get_object(self.bus_name, self.object_path)
+                self._interface = dbus.Interface(obj, self.interface_name)
+            return self._bus, self._interface
+
+    def reset(self):
+        '''
+        Drop the connection, the next call reconnects.
+        '''
+        with self._lock:
+            bus, self._bus, self._interface = self._bus, None, None
+        if bus is not None and bus is not self._shared_bus:
+            try:
+                bus.close()
+            except Exception:
+                pass
+
+    def call(self, method, *args, **kwargs):
+        '''
+        Call a method of the proxied object. Keyword arguments are passed
+        to dbus-python, e.g. ``signature`` of the arguments.
+        '''
+        import dbus
+        try:
+            return getattr(self._connect()[1], method)(*args, **kwargs)
+        except dbus.exceptions.DBusException:
+            self.reset()
+            return getattr(self._connect()[1], method)(*args, **kwargs)
+
+
+class SignalListener:
+    '''
+    A single background thread running GLib main loop, which dispatches
+    signals from the session bus to the connected callbacks. It's shared
+    by all the users in the process, see :meth:`instance`.
+
+    Requires dbus-python and PyGObject. Callbacks are called
+    from the listener thread.
+    '''
+
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self):
+        self._bus = None
+        self._loop = None
+        self._thread = None
+
+    @classmethod
+    def instance(cls):
+        '''
+        Return the shared listener, start it if it isn't running yet.
+        '''
+        with cls._instance_lock:
+            if cls._instance is None:
+                listener = cls()
+                listener.start()
+                cls._instance = listener
+            return cls._instance
+
+    @property
+    def bus(self):
+        '''
+        Session bus connection the signals are received on.
+        '''
+        return self._bus
+
+    def start(self):
+        '''
+        Connect to the session bus and start the listener thread.
+        '''
+        import dbus
+        from dbus.mainloop.glib import DBusGMainLoop, threads_init
+        from gi.repository import GLib
+
+        threads_init()
+        self._bus = dbus.SessionBus(mainloop=DBusGMainLoop(), private=True)
+        self._loop = GLib.MainLoop()
+        self._thread = Thread(
+            target=self._loop.run, name='plyer-dbus-signals', daemon=True
+        )
+        self._thread.start()
+
+    def connect(self, interface, signal, callback, path=None):
+        '''
+        Call `callback` with the signal arguments for each `signal`
+        of `interface`, optionally only for an object on `path`.
+        Returns a match object, call its ``remove()`` to disconnect.
+        '''
+        return self._bus.add_signal_receiver(
+            callback, signal_name=signal, dbus_interface=interface, path=path
+        )
+
+    def stop(self):
+        '''
+        Stop the listener thread and close the connection, the next
+        :meth:`instance` starts a new listener.
+        '''
+        cls = type(self)
+        with cls._instance_lock:
+            if cls._instance is self:
+                cls._instance = None
+        self._loop.quit()
+        self._thread.join()
+        self._bus.close()
@@ -0,0 +1,279 @@
+'''
+Capture of the X11 root window into a shared memory segment with the MIT-SHM
+extension, through ctypes bindings of libX11 and libXext.
+'''
+
+__all__ = ('XShmCapture', 'available')
+
+import ctypes
+import os
+from contextlib import contextmanager
+from ctypes import (
+    CFUNCTYPE, POINTER, Structure, byref,
+    c_char_p, c_int, c_size_t, c_uint, c_ulong, c_void_p
+)
+from ctypes.util import find_library
+from functools import lru_cache
+from threading import Lock
+
+from plyer.platforms.linux.libs.xwd import XWDHeader, XWDImage, ZPIXMAP
+
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+ALL_PLANES = ~0 & (2 ** (8 * ctypes.sizeof(c_ulong)) - 1)
+# visual classes with color masks
+TRUE_COLOR = 4
+DIRECT_COLOR = 5
+
+
+class Visual(Structure):
+    _fields_ = [
+        ('ext_data', c_void_p), ('visualid', c_ulong), ('c_class', c_int),
+        ('red_mask', c_ulong), ('green_mask', c_ulong),
+        ('blue_mask', c_ulong), ('bits_per_rgb', c_int),
+        ('map_entries', c_int)
+    ]
+
+
+class XImage(Structure):
+    # only the leading fields, the image is allocated by Xlib
+    _fields_ = [
+        ('width', c_int), ('height', c_int), ('xoffset', c_int),
+        ('format', c_int), ('data', c_void_p), ('byte_order', c_int),
+        ('bitmap_unit', c_int), ('bitmap_bit_order', c_int),
+        ('bitmap_pad', c_int), ('depth', c_int), ('bytes_per_line', c_int),
+        ('bits_per_pixel', c_int), ('red_mask', c_ulong),
+        ('green_mask', c_ulong), ('blue_mask', c_ulong)
+    ]
+
+
+class XShmSegmentInfo(Structure):
+    _fields_ = [
+        ('shmseg', c_ulong), ('shmid', c_int), ('shmaddr', c_void_p),
+        ('readOnly', c_int)
+    ]
+
+
+XErrorHandler = CFUNCTYPE(c_int, c_void_p, c_void_p)
+
+
+@lru_cache(maxsize=None)
+def library_names():
+    '''
+    Return the file names of libX11, libXext and libc, None for the missing
+    ones. The lookup runs external tools, so it's done once.
+    '''
+    return tuple(find_library(name) for name in ('X11', 'Xext', 'c'))
+
+
+def available():
+    '''
+    Check whether there's a display and the libraries for
+    :class:`XShmCapture`, without connecting to the display.
+    '''
+    return bool(os.environ.get('DISPLAY') and all(library_names()[:2]))
+
+
+@lru_cache(maxsize=None)
+def load_libraries():
+    '''
+    Load libX11, libXext and libc with the prototypes of the used functions.
+    The libraries are loaded once and shared by all the captures.
+    '''
+    names = library_names()
+    if not all(names):
+        raise OSError('libX11 or libXext not found')
+    x11, xext = ctypes.CDLL(names[0]), ctypes.CDLL(names[1])
+    libc = ctypes.CDLL(names[2], use_errno=True)
+
+    prototypes = (
+        (x11.XOpenDisplay, c_void_p, [c_char_p]),
+        (x11.XCloseDisplay, c_int, [c_void_p]),
+        (x11.XDefaultScreen, c_int, [c_void_p]),
+        (x11.XRootWindow, c_ulong, [c_void_p, c_int]),
+        (x11.XDisplayWidth, c_int, [c_void_p, c_int]),
+        (x11.XDisplayHeight, c_int, [c_void_p, c_int]),
+        (x11.XDefaultVisual, POINTER(Visual), [c_void_p, c_int]),
+        (x11.XDefaultDepth, c_int, [c_void_p, c_int]),
+        (x11.XSync, c_int, [c_void_p, c_int]),
+        (x11.XDestroyImage, c_int, [POINTER(XImage)]),
+        (x11.XSetErrorHandler, c_void_p, [c_void_p]),
+        (xext.XShmQueryExtension, c_int, [c_void_p]),
+        (xext.XShmCreateImage, POINTER(XImage), [
+            c_void_p, POINTER(Visual), c_uint, c_int, c_void_p,
+            POINTER(XShmSegmentInfo), c_uint, c_uint
+        ]),
+        (xext.XShmAttach, c_int, [c_void_p, POINTER(XShmSegmentInfo)]),
+        (xext.XShmDetach, c_int, [c_void_p, POINTER(XShmSegmentInfo)]),
+        (xext.XShmGetImage, c_int, [
+            c_void_p, c_ulong, POINTER(XImage), c_int, c_int, c_ulong
+        ]),
+        (libc.shmget, c_int, [c_int, c_size_t, c_int]),
+        (libc.shmat, c_void_p, [c_int, c_void_p, c_int]),
+        (libc.shmdt, c_int, [c_void_p]),
+        (libc.shmctl, c_int, [c_int, c_int, c_void_p])
+    )
+    for function, restype, argtypes in prototypes:
+        function.restype = restype
+        function.argtypes = argtypes
+    return x11, xext, libc
+
+
+class XShmCapture:
+    '''
+    Capture of the root window of a display (``$DISPLAY`` by default)
+    into a shared memory segment, which is allocated once and reused
+    by all the captures.
+
+    :meth:`capture` returns an :class:`XWDImage` over the segment without
+    copying it, the next capture overwrites its pixels and the images
+    mustn't be used after :meth:`close`. Raises `OSError`
+    if the display, the libraries or the MIT-SHM extension aren't
+    available.
+
+    .. versionadded:: 2.2.0
+    '''
+
+    def __init__(self, display=None):
+        self._x11, self._xext, self._libc = load_libraries()
+        self._lock = Lock()
+        self._errors = []
+        self._image = None
+        self._shminfo = XShmSegmentInfo()
+        self._attached = False
+
+        self._display = self._x11.XOpenDisplay(
+            display.encode('utf-8') if display else None
+        )
+        if not self._display:
+            raise OSError('Cannot open display {}'.format(
+                display or os.environ.get('DISPLAY')
+            ))
+        try:
+            self._setup()
+        except Exception:
+            self.close()
+            raise
+
+    def _setup(self):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        display = self._display
+        if not xext.XShmQueryExtension(display):
+            raise OSError('The display has no MIT-SHM extension')
+
+        screen = x11.XDefaultScreen(display)
+        self._root = x11.XRootWindow(display, screen)
+        self._visual = visual = x11.XDefaultVisual(display, screen).contents
+        if visual.c_class not in (TRUE_COLOR, DIRECT_COLOR):
+            raise OSError('Only TrueColor visuals are supported')
+
+        width = x11.XDisplayWidth(display, screen)
+        height = x11.XDisplayHeight(display, screen)
+        self._image = xext.XShmCreateImage(
+            display, byref(visual), x11.XDefaultDepth(display, screen),
+            ZPIXMAP, None, byref(self._shminfo), width, height
+        )
+        if not self._image:
+            raise OSError('Cannot create a shared memory image')
+        image = self._image.contents
+
+        size = image.bytes_per_line * image.height
+        shminfo = self._shminfo
+        shminfo.shmid = libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            raise OSError(ctypes.get_errno(), 'shmget failed')
+        address = libc.shmat(shminfo.shmid, None, 0)
+        if address in (None, c_void_p(-1).value):
+            libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            raise OSError(ctypes.get_errno(), 'shmat failed')
+        shminfo.shmaddr = image.data = address
+        shminfo.readOnly = False
+
+        try:
+            with self._trap_errors():
+                xext.XShmAttach(display, byref(shminfo))
+                x11.XSync(display, False)
+        finally:
+            # the segment is removed once both sides detach it
+            libc.shmctl(shminfo.shmid, IPC_RMID, None)
+        self._pixels = memoryview(
+            (ctypes.c_ubyte * size).from_address(address)
+        ).cast('B')
+        self._attached = True
+        self.header = XWDHeader(
+            101, 7, ZPIXMAP, image.depth, image.width, image.height, 0,
+            image.byte_order, image.bitmap_unit, image.bitmap_bit_order,
+            image.bitmap_pad, image.bits_per_pixel, image.bytes_per_line,
+            visual.c_class, image.red_mask, image.green_mask,
+            image.blue_mask, visual.bits_per_rgb, visual.map_entries, 0,
+            image.width, image.height, 0, 0, 0
+        )
+
+    @contextmanager
+    def _trap_errors(self):
+        # the default handler of Xlib exits the process on an X error
+        def handler(display, event):
+            self._errors.append(event)
+            return 0
+
+        callback = XErrorHandler(handler)
+        previous = self._x11.XSetErrorHandler(callback)
+        del self._errors[:]
+        try:
+            yield
+        finally:
+            self._x11.XSync(self._display, False)
+            self._x11.XSetErrorHandler(previous)
+        if self._errors:
+            raise OSError('X error during a shared memory capture')
+
+    @property
+    def width(self):
+        return self.header.pixmap_width
+
+    @property
+    def height(self):
+        return self.header.pixmap_height
+
+    def capture(self):
+        '''
+        Capture the root window, return an :class:`XWDImage` over
+        the shared memory.
+        '''
+        with self._lock:
+            if not self._attached:
+                raise OSError('The capture is closed')
+            with self._trap_errors():
+                self._xext.XShmGetImage(
+                    self._display, self._root, self._image, 0, 0, ALL_PLANES
+                )
+            return XWDImage.from_pixels(self.header, self._pixels, 'root')
+
+    def close(self):
+        '''
+        Detach and remove the shared memory segment and close the display.
+        '''
+        with self._lock:
+            x11, display = self._x11, self._display
+            if self._attached:
+                self._xext.XShmDetach(display, byref(self._shminfo))
+                x11.XSync(display, False)
+                self._attached = False
+            if self._shminfo.shmaddr:
+                self._libc.shmdt(self._shminfo.shmaddr)
+                self._shminfo.shmaddr = None
+            if self._image:
+                # the data belongs to the segment, not to Xlib
+                self._image.contents.data = None
+                x11.XDestroyImage(self._image)
+                self._image = None
+            if display:
+                x11.XCloseDisplay(display)
+                self._display = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
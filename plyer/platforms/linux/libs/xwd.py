@@ -0,0 +1,389 @@
+'''
+Decoder of X Window Dump (XWD) images, as written by ``xwd``.
+
+The pixels are never copied while decoding, :meth:`XWDImage.to_array`
+returns a NumPy view of the dump where the visual allows it and PNG export
+converts the dump row by row, with NumPy if it's available.
+'''
+
+__all__ = ('XWDHeader', 'XWDImage')
+
+import struct
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+from itertools import repeat
+
+from plyer.utils import module_available
+
+XWDHeader = namedtuple('XWDHeader', (
+    'header_size', 'file_version', 'pixmap_format', 'pixmap_depth',
+    'pixmap_width', 'pixmap_height', 'xoffset', 'byte_order',
+    'bitmap_unit', 'bitmap_bit_order', 'bitmap_pad', 'bits_per_pixel',
+    'bytes_per_line', 'visual_class', 'red_mask', 'green_mask', 'blue_mask',
+    'bits_per_rgb', 'colormap_entries', 'ncolors', 'window_width',
+    'window_height', 'window_x', 'window_y', 'window_bdrwidth'
+))
+
+# the header and the colormap are always big-endian
+HEADER = struct.Struct('>25I')
+COLOR = struct.Struct('>I3H2B')
+
+XWD_FILE_VERSION = 7
+ZPIXMAP = 2
+LSB_FIRST = 0
+# visual classes with a colormap instead of color masks
+COLORMAP_VISUALS = (0, 1, 2, 3)
+# rows converted with NumPy at once by XWDImage.iter_rows
+ARRAY_ROWS = 64
+
+
+def mask_shift(mask):
+    '''
+    Return the shift and the maximum value of a color mask.
+    '''
+    shift = (mask & -mask).bit_length() - 1
+    return shift, mask >> shift
+
+
+def channel_shift(mask):
+    '''
+    Return the shift and the maximum value of the 8 most significant bits
+    of a color mask, the bits converted to a byte.
+    '''
+    shift, maximum = mask_shift(mask)
+    extra = max(maximum.bit_length() - 8, 0)
+    return shift + extra, maximum >> extra
+
+
+def png_chunk(kind, data):
+    return b''.join((
+        struct.pack('>I', len(data)), kind, data,
+        struct.pack('>I', zlib.crc32(kind + data))
+    ))
+
+
+class XWDImage:
+    '''
+    A ZPixmap XWD image over a bytes-like object, e.g. the output
+    of ``xwd -silent -root``.
+
+    .. versionadded:: 2.2.0
+    '''
+
+    def __init__(self, data):
+        data = memoryview(data).cast('B')
+        if len(data) < HEADER.size:
+            raise ValueError('Truncated XWD header')
+
+        self.header = header = XWDHeader(*HEADER.unpack_from(data))
+        if header.file_version != XWD_FILE_VERSION:
+            raise ValueError(
+                'Unsupported XWD version {}'.format(header.file_version)
+            )
+        if header.pixmap_format != ZPIXMAP:
+            raise ValueError('Only ZPixmap XWD images are supported')
+        if header.bits_per_pixel not in (8, 16, 24, 32):
+            raise ValueError('Unsupported XWD pixel size {}'.format(
+                header.bits_per_pixel
+            ))
+        masks = (header.red_mask, header.green_mask, header.blue_mask)
+        if header.visual_class not in COLORMAP_VISUALS and not all(masks):
+            raise ValueError('Missing XWD color masks')
+
+        name = bytes(data[HEADER.size:header.header_size])
+        self.window_name = name.split(b'\0', 1)[0].decode('latin-1')
+
+        offset = header.header_size
+        self.colors = [
+            COLOR.unpack_from(data, offset + index * COLOR.size)[:4]
+            for index in range(header.ncolors)
+        ]
+
+        offset += header.ncolors * COLOR.size
+        size = header.bytes_per_line * header.pixmap_height
+        if len(data) < offset + size:
+            raise ValueError('Truncated XWD pixel data')
+        self.pixels = data[offset:offset + size]
+
+    @classmethod
+    def from_pixels(cls, header, pixels, window_name='', colors=()):
+        '''
+        Create an image over the pixel rows described by `header`,
+        e.g. of a shared memory capture.
+        '''
+        image = cls.__new__(cls)
+        image.header = header
+        image.window_name = window_name
+        image.colors = list(colors)
+        image.pixels = memoryview(pixels).cast('B')
+        return image
+
+    @classmethod
+    def open(cls, path):
+        '''
+        Read an XWD image from a file.
+        '''
+        with open(path, 'rb') as fle:
+            return cls(fle.read())
+
+    def dump(self):
+        '''
+        Return the image in the XWD format.
+        '''
+        name = self.window_name.encode('latin-1') + b'\0'
+        header = self.header._replace(
+            header_size=HEADER.size + len(name), ncolors=len(self.colors)
+        )
+        return b''.join([HEADER.pack(*header), name] + [
+            COLOR.pack(pixel, red, green, blue, 7, 0)
+            for pixel, red, green, blue in self.colors
+        ] + [self.pixels])
+
+    @property
+    def width(self):
+        return self.header.pixmap_width
+
+    @property
+    def height(self):
+        return self.header.pixmap_height
+
+    @property
+    def bytes_per_pixel(self):
+        return self.header.bits_per_pixel // 8
+
+    def channel_offsets(self):
+        '''
+        Return offsets of the red, green and blue bytes inside of a pixel,
+        or None if the channels aren't whole bytes.
+        '''
+        header = self.header
+        if header.visual_class in COLORMAP_VISUALS:
+            return None
+
+        size = self.bytes_per_pixel
+        offsets = []
+        for mask in (header.red_mask, header.green_mask, header.blue_mask):
+            shift, maximum = mask_shift(mask)
+            if maximum != 0xFF or shift % 8:
+                return None
+            index = shift // 8
+            if header.byte_order != LSB_FIRST:
+                index = size - 1 - index
+            offsets.append(index)
+        return offsets
+
+    def to_array(self, alpha=False):
+        '''
+        Return the image as a ``(height, width, 3)`` NumPy array of RGB
+        bytes, or ``(height, width, 4)`` RGBA with opaque alpha.
+
+        The RGB array is a read-only view over the dump when the channels
+        are whole bytes (e.g. BGRX or XRGB 32-bit visuals), otherwise it's
+        computed from the masks or the colormap.
+        '''
+        import numpy as np
+        from numpy.lib.stride_tricks import as_strided
+
+        header = self.header
+        base = np.frombuffer(self.pixels, dtype=np.uint8)
+        offsets = self.channel_offsets()
+
+        if offsets and offsets[1] - offsets[0] == offsets[2] - offsets[1] \
+                and abs(offsets[1] - offsets[0]) == 1:
+            rgb = as_strided(
+                base[offsets[0]:],
+                shape=(self.height, self.width, 3),
+                strides=(
+                    header.bytes_per_line, self.bytes_per_pixel,
+                    offsets[1] - offsets[0]
+                ),
+                writeable=False
+            )
+        else:
+            rgb = self._convert_array(np, base)
+
+        if not alpha:
+            return rgb
+        rgba = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        rgba[..., :3] = rgb
+        rgba[..., 3] = 0xFF
+        return rgba
+
+    def _convert_array(self, np, base, height=None):
+        # `height` rows of the pixels from the start of `base`
+        header = self.header
+        height = self.height if height is None else height
+        size = self.bytes_per_pixel
+        rows = base[:height * header.bytes_per_line].reshape(
+            height, header.bytes_per_line
+        )
+        rows = rows[:, :self.width * size].reshape(
+            height, self.width, size
+        ).astype(np.uint32)
+
+        # assemble the pixel values from their bytes
+        order = range(size)
+        if header.byte_order != LSB_FIRST:
+            order = reversed(order)
+        values = np.zeros((height, self.width), dtype=np.uint32)
+        for shift, index in enumerate(order):
+            values |= rows[..., index] << (8 * shift)
+
+        if header.visual_class in COLORMAP_VISUALS:
+            # pixels missing in the colormap are black, including the ones
+            # past the last entry
+            lut = np.zeros((max(
+                [pixel for pixel, _, _, _ in self.colors] + [0]
+            ) + 2, 3), dtype=np.uint8)
+            for pixel, red, green, blue in self.colors:
+                lut[pixel] = (red >> 8, green >> 8, blue >> 8)
+            return lut[np.minimum(values, len(lut) - 1)]
+
+        rgb = np.empty((height, self.width, 3), dtype=np.uint8)
+        masks = (header.red_mask, header.green_mask, header.blue_mask)
+        for channel, mask in enumerate(masks):
+            shift, maximum = channel_shift(mask)
+            rgb[..., channel] = (values >> shift & maximum) * 0xFF // maximum
+        return rgb
+
+    def iter_rows(self):
+        '''
+        Yield the rows of the image as RGB bytes, converted with slicing
+        where the channels are whole bytes, otherwise a whole row at once
+        with NumPy if it's available or with integer and bytes operations.
+        '''
+        header = self.header
+        size = self.bytes_per_pixel
+        width = self.width
+        offsets = self.channel_offsets()
+        if offsets is None and module_available('numpy'):
+            yield from self._iter_array_rows()
+            return
+        convert = self._row_converter() if offsets is None else None
+
+        row = bytearray(width * 3)
+        for index in range(self.height):
+            start = index * header.bytes_per_line
+            line = self.pixels[start:start + width * size]
+            if convert is None:
+                for channel, offset in enumerate(offsets):
+                    row[channel::3] = line[offset::size]
+                yield bytes(row)
+            else:
+                yield convert(line)
+
+    def _iter_array_rows(self):
+        import numpy as np
+
+        step = self.header.bytes_per_line
+        base = np.frombuffer(self.pixels, dtype=np.uint8)
+        for first in range(0, self.height, ARRAY_ROWS):
+            height = min(ARRAY_ROWS, self.height - first)
+            rgb = self._convert_array(np, base[first * step:], height)
+            for row in rgb:
+                yield row.tobytes()
+
+    def _row_converter(self):
+        '''
+        Return a function converting a row of pixels to RGB bytes
+        for visuals whose channels aren't whole bytes.
+        '''
+        header = self.header
+        size = self.bytes_per_pixel
+        width = self.width
+        order = 'little' if header.byte_order == LSB_FIRST else 'big'
+
+        if header.visual_class in COLORMAP_VISUALS:
+            colormap = {
+                pixel: bytes((red >> 8, green >> 8, blue >> 8))
+                for pixel, red, green, blue in self.colors
+            }
+            if size == 1:
+                # a translation table of the pixel values per channel
+                tables = [
+                    bytes(
+                        colormap.get(value, b'\0\0\0')[channel]
+                        for value in range(256)
+                    )
+                    for channel in range(3)
+                ]
+
+                def convert(line):
+                    line = bytes(line)
+                    row = bytearray(width * 3)
+                    for channel, table in enumerate(tables):
+                        row[channel::3] = line.translate(table)
+                    return bytes(row)
+                return convert
+
+            typecode = next((
+                code for code in 'HIL'
+                if array(code).itemsize == size
+            ), None)
+
+            def convert(line):
+                if typecode is None:
+                    values = [
+                        int.from_bytes(line[start:start + size], order)
+                        for start in range(0, len(line), size)
+                    ]
+                else:
+                    values = array(typecode)
+                    values.frombytes(line)
+                    if order != sys.byteorder:
+                        values.byteswap()
+                return b''.join(
+                    map(colormap.get, values, repeat(b'\0\0\0'))
+                )
+            return convert
+
+        # the row is converted as a single integer, a channel is masked
+        # and shifted to the lowest byte of each pixel and scaled to
+        # 8 bits with a translation table
+        channels = []
+        for mask in (header.red_mask, header.green_mask, header.blue_mask):
+            shift, maximum = channel_shift(mask)
+            repeated = int.from_bytes(
+                (maximum << shift).to_bytes(size, order) * width, order
+            )
+            table = bytes(
+                min(value, maximum) * 0xFF // maximum for value in range(256)
+            )
+            channels.append((repeated, shift, table))
+        low = 0 if order == 'little' else size - 1
+
+        def convert(line):
+            value = int.from_bytes(line, order)
+            row = bytearray(width * 3)
+            for channel, (repeated, shift, table) in enumerate(channels):
+                data = ((value & repeated) >> shift).to_bytes(
+                    len(line), order
+                )
+                row[channel::3] = data[low::size].translate(table)
+            return bytes(row)
+        return convert
+
+    def to_png(self, level=6):
+        '''
+        Encode the image as an RGB PNG.
+        '''
+        compressor = zlib.compressobj(level)
+        data = [compressor.compress(b'\0' + row) for row in self.iter_rows()]
+        data.append(compressor.flush())
+        return b''.join((
+            b'\x89PNG\r\n\x1a\n',
+            png_chunk(b'IHDR', struct.pack(
+                '>2I5B', self.width, self.height, 8, 2, 0, 0, 0
+            )),
+            png_chunk(b'IDAT', b''.join(data)),
+            png_chunk(b'IEND', b'')
+        ))
+
+    def save_png(self, path, level=6):
+        '''
+        Write the image as an RGB PNG file.
+        '''
+        with open(path, 'wb') as fle:
+            fle.write(self.to_png(level))
@@ -4,27 +4,188 @@ Module of Linux API for plyer.notification.
 
 import warnings
 import subprocess
+from contextlib import contextmanager
+from itertools import chain, count
+from threading import Lock, RLock
 from plyer.facades import Notification
-from plyer.utils import whereis_exe
+from plyer.platforms.linux.libs.session_bus import (
+    SessionBusProxy, SignalListener
+)
+from plyer.utils import whereis_exe, module_available
 import os
 
 
+def gvariant_string(value):
+    '''
+    Format a string as a GVariant text format literal.
+    '''
+    value = value.replace('\\', '\\\\').replace("'", "\\'")
+    return "'{}'".format(value.replace('\n', '\\n'))
+
+
+class NotificationCallbacks:
+    '''
+    Route action and close signals of notifications received by the shared
+    :class:`SignalListener` to the callbacks registered for their handles.
+    The signals are subscribed to once, on the first registered callback.
+    '''
+
+    def __init__(self, interface, closed_signal=None):
+        self.interface = interface
+        self.closed_signal = closed_signal
+        self._callbacks = {}
+        self._lock = RLock()
+        self._listening = False
+
+    def listen(self):
+        '''
+        Subscribe to the signals if not subscribed yet.
+        '''
+        with self._lock:
+            if self._listening:
+                return
+            listener = SignalListener.instance()
+            listener.connect(self.interface, 'ActionInvoked', self._action)
+            if self.closed_signal:
+                listener.connect(
+                    self.interface, self.closed_signal, self._closed
+                )
+            self._listening = True
+
+    @contextmanager
+    def hold(self):
+        '''
+        Hold back the dispatching of the signals, e.g. until the handle
+        returned by the server is registered.
+        '''
+        with self._lock:
+            yield
+
+    def register(self, handle, on_action=None, on_close=None):
+        with self._lock:
+            self._callbacks[handle] = (on_action, on_close)
+
+    def discard(self, handle):
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+    def _action(self, handle, action, *args):
+        with self._lock:
+            on_action = self._callbacks.get(handle, (None, None))[0]
+        if on_action:
+            on_action(handle, action)
+
+    def _closed(self, handle, reason):
+        with self._lock:
+            on_close = self._callbacks.pop(handle, (None, None))[1]
+        if on_close:
+            on_close(handle, reason)
+
+
 class NotifyDesktopPortals(Notification):
     '''
     Implementation of xdg-desktop-portals API.
+
+    Notifications are sent over a persistent session bus connection
+    with dbus-python, or with ``gdbus`` if dbus-python isn't available
+    (e.g. inside of a Flatpak sandbox).
+
+    .. versionchanged:: 2.2.0
+       Use a persistent D-Bus connection, return an ID usable for
+       replacing or removing of the notification.
     '''
 
+    _bus_name = 'org.freedesktop.portal.Desktop'
+    _object_path = '/org/freedesktop/portal/desktop'
+    _interface_name = 'org.freedesktop.portal.Notification'
+
+    def __init__(self):
+        self._ids = count(1)
+        self._proxy = None
+        if module_available('dbus'):
+            self._proxy = SessionBusProxy(
+                self._bus_name, self._object_path, self._interface_name
+            )
+        self._callbacks = NotificationCallbacks(self._interface_name)
+        self._lock = Lock()
+        self._listening = False
+
+    def _listen(self):
+        # the portal sends ActionInvoked only to the connection which
+        # added the notification, switch to the one of the listener
+        self._callbacks.listen()
+        with self._lock:
+            if self._listening:
+                return
+            private, self._proxy = self._proxy, SessionBusProxy(
+                self._bus_name, self._object_path, self._interface_name,
+                bus=SignalListener.instance().bus
+            )
+            self._listening = True
+        private.reset()
+
+    def _call(self, method, *args):
+        if self._proxy is not None:
+            return self._proxy.call(method, *args)
+
+        subprocess.run([
+            "gdbus", "call", "--session", "--dest", self._bus_name,
+            "--object-path", self._object_path, "--method",
+            "{}.{}".format(self._interface_name, method)
+        ] + list(args), stdout=subprocess.DEVNULL)
+
     def _notify(self, **kwargs):
         title = kwargs.get("title", "title")
         body = kwargs.get("message", "body")
 
-        subprocess.run([
-            "gdbus", "call", "--session", "--dest",
-            "org.freedesktop.portal.Desktop",
-            "--object-path", "/org/freedesktop/portal/desktop", "--method",
-            "org.freedesktop.portal.Notification.AddNotification", "",
-            "{'title': <'" + title + "'>, 'body': <'" + body + "'>}"
-        ], stdout=subprocess.DEVNULL)
+        # IDs are chosen by the application, reusing one replaces
+        # the notification
+        handle = kwargs.get('replaces_id') or 'plyer-{}-{}'.format(
+            os.getpid(), next(self._ids)
+        )
+
+        if self._proxy is not None:
+            import dbus
+            notification = dbus.Dictionary({
+                'title': dbus.String(title, variant_level=1),
+                'body': dbus.String(body, variant_level=1)
+            }, signature='sv')
+
+            actions = kwargs.get('actions')
+            if actions:
+                notification['buttons'] = dbus.Array([
+                    dbus.Dictionary({
+                        'label': dbus.String(label, variant_level=1),
+                        'action': dbus.String(key, variant_level=1)
+                    }, signature='sv')
+                    for key, label in actions
+                ], signature='a{sv}', variant_level=1)
+
+            on_action = kwargs.get('on_action')
+            if on_action:
+                self._listen()
+                self._callbacks.register(handle, on_action)
+            self._call('AddNotification', handle, notification)
+        else:
+            if kwargs.get('actions') or kwargs.get('on_action'):
+                warnings.warn(
+                    'Notification actions require dbus-python, '
+                    'sending the notification without them.'
+                )
+            self._call(
+                'AddNotification', gvariant_string(handle),
+                "{{'title': <{}>, 'body': <{}>}}".format(
+                    gvariant_string(title), gvariant_string(body)
+                )
+            )
+        return handle
+
+    def _close(self, handle):
+        self._callbacks.discard(handle)
+        if self._proxy is not None:
+            self._call('RemoveNotification', handle)
+        else:
+            self._call('RemoveNotification', gvariant_string(handle))
 
 
 class NotifySendNotification(Notification):
@@ -58,32 +219,86 @@ class NotifyDbus(Notification):
     '''
     Implementation of Linux notification API
     using dbus library and dbus-python wrapper.
+
+    .. versionchanged:: 2.2.0
+       The session bus connection and the notification server proxy
+       are created once and reused for all notifications. Added
+       ``on_action`` and ``on_close`` callbacks, which require PyGObject.
     '''
 
+    _bus_name = 'org.freedesktop.Notifications'
+    _object_path = '/org/freedesktop/Notifications'
+    _interface_name = 'org.freedesktop.Notifications'
+
+    def __init__(self):
+        self._proxy = SessionBusProxy(
+            self._bus_name, self._object_path, self._interface_name
+        )
+        self._callbacks = NotificationCallbacks(
+            self._interface_name, 'NotificationClosed'
+        )
+        self._lock = Lock()
+        self._listening = False
+
+    def _listen(self):
+        # servers can send the signals only to the connection which
+        # sent the notification, switch to the one of the listener
+        self._callbacks.listen()
+        with self._lock:
+            if self._listening:
+                return
+            private, self._proxy = self._proxy, SessionBusProxy(
+                self._bus_name, self._object_path, self._interface_name,
+                bus=SignalListener.instance().bus
+            )
+            self._listening = True
+        private.reset()
+
     def _notify(self, **kwargs):
         summary = kwargs.get('title', "title")
         body = kwargs.get('message', "body")
         app_name = kwargs.get('app_name', '')
         app_icon = kwargs.get('app_icon', '')
         timeout = kwargs.get('timeout', 10)
-        actions = kwargs.get('actions', [])
+        # flat list of action keys and labels
+        actions = list(chain.from_iterable(kwargs.get('actions') or []))
         hints = kwargs.get('hints', {})
         replaces_id = kwargs.get('replaces_id', 0)
+        on_action = kwargs.get('on_action')
+        on_close = kwargs.get('on_close')
+
+        if not (on_action or on_close):
+            return self._send(
+                app_name, replaces_id, app_icon, summary, body, actions,
+                hints, timeout
+            )
 
-        _bus_name = 'org.freedesktop.Notifications'
-        _object_path = '/org/freedesktop/Notifications'
-        _interface_name = _bus_name
+        # subscribe before the notification can be clicked and hold
+        # the signals back until the returned handle is registered
+        self._listen()
+        with self._callbacks.hold():
+            handle = self._send(
+                app_name, replaces_id, app_icon, summary, body, actions,
+                hints, timeout
+            )
+            self._callbacks.register(handle, on_action, on_close)
+        return handle
 
-        import dbus
-        session_bus = dbus.SessionBus()
-        obj = session_bus.get_object(_bus_name, _object_path)
-        interface = dbus.Interface(obj, _interface_name)
-        interface.Notify(
-            app_name, replaces_id, app_icon,
+    def _send(self, app_name, replaces_id, app_icon, summary, body,
+              actions, hints, timeout):
+        # explicit types, dbus-python can't guess them from empty
+        # containers and would send the ID as a signed int
+        return self._proxy.call(
+            'Notify',
+            app_name, replaces_id or 0, app_icon,
             summary, body, actions,
-            hints, timeout * 1000
+            hints, int(timeout * 1000),
+            signature='susssasa{sv}i'
         )
 
+    def _close(self, handle):
+        self._proxy.call('CloseNotification', handle, signature='u')
+
 
 def instance():
     '''
@@ -92,15 +307,15 @@ def instance():
     if os.path.isdir("/app"):
         # Flatpak
         return NotifyDesktopPortals()
-    try:
-        import dbus  # noqa: F401
+    # dbus itself is imported on the first notification
+    if module_available('dbus'):
         return NotifyDbus()
-    except ImportError:
-        msg = ("The Python dbus package is not installed.\n"
-               "Try installing it with your distribution's package manager, "
-               "it is usually called python-dbus or python3-dbus, but you "
-               "might have to try dbus-python instead, e.g. when using pip.")
-        warnings.warn(msg)
+
+    msg = ("The Python dbus package is not installed.\n"
+           "Try installing it with your distribution's package manager, "
+           "it is usually called python-dbus or python3-dbus, but you "
+           "might have to try dbus-python instead, e.g. when using pip.")
+    warnings.warn(msg)
 
     if whereis_exe('notify-send'):
         return NotifySendNotification()
@@ -1,19 +1,300 @@
+import os
+import re
 import subprocess
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join
+from time import monotonic, sleep
 from plyer.facades import Screenshot
-from plyer.utils import whereis_exe
+from plyer.utils import reify, whereis_exe
+from plyer.platforms.linux.libs import xshm
+from plyer.platforms.linux.libs.xwd import XWDImage
 from plyer.platforms.linux.storagepath import LinuxStoragePath
 
+Monitor = namedtuple('Monitor', 'name x y width height primary')
+
+# e.g. " 0: +*eDP-1 1920/344x1080/194+0+0  eDP-1"
+XRANDR_MONITOR = re.compile(
+    r'^\s*\d+:\s+\+?(\*?)\S*\s+(\d+)/\d+x(\d+)/\d+\+(\d+)\+(\d+)\s+(\S+)\s*$'
+)
+
+
+def list_monitors():
+    '''
+    Return the geometry of the active monitors from ``xrandr``.
+    '''
+    output = subprocess.run(
+        ['xrandr', '--listmonitors'], stdout=subprocess.PIPE,
+        check=True, universal_newlines=True
+    ).stdout
+
+    monitors = []
+    for line in output.splitlines():
+        match = XRANDR_MONITOR.match(line)
+        if match:
+            primary, width, height, x, y, name = match.groups()
+            monitors.append(Monitor(
+                name, int(x), int(y), int(width), int(height), bool(primary)
+            ))
+    return monitors
+
+
+class ScreenFrame(namedtuple(
+        'ScreenFrame', 'time index region image changed')):
+    '''
+    A frame of :class:`CaptureStream`, a `region` of the captured
+    :class:`XWDImage`. `changed` lists the indices of the bands
+    of :attr:`CaptureStream.band_height` rows which differ from
+    the previous frame.
+    '''
+
+    __slots__ = ()
+
+    def rows(self):
+        '''
+        Yield the pixel rows of the region as memoryviews of the dump.
+        '''
+        x, y, width, height = self.region
+        size = self.image.bytes_per_pixel
+        bytes_per_line = self.image.header.bytes_per_line
+        for row in range(y, y + height):
+            start = row * bytes_per_line + x * size
+            yield self.image.pixels[start:start + width * size]
+
+    def crop(self):
+        '''
+        Copy the region into a new :class:`XWDImage`, independent
+        of the capture buffer.
+        '''
+        _, _, width, height = self.region
+        image = self.image
+        header = image.header._replace(
+            pixmap_width=width, pixmap_height=height,
+            window_width=width, window_height=height,
+            bytes_per_line=width * image.bytes_per_pixel
+        )
+        return XWDImage.from_pixels(
+            header, b''.join(self.rows()), image.window_name, image.colors
+        )
+
+
+EncodedFrame = namedtuple('EncodedFrame', 'time index region data')
+
+
+class EncodingPipeline:
+    '''
+    Iterable of the :class:`ScreenFrame` frames of `stream` encoded
+    to PNG on a pool of `workers` threads, as zlib releases the GIL.
+    The encoded frames are yielded in the order of capture.
+
+    At most `max_pending` frames are encoded at a time. When a frame
+    arrives while the pool is full, it's dropped and counted in
+    :attr:`dropped`, or if `block` is True the capture waits for the
+    oldest frame instead.
+
+    .. versionadded:: 2.2.0
+    '''
+
+    def __init__(self, stream, workers=None, max_pending=None, level=6,
+                 block=False):
+        self.stream = stream
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.level = level
+        self.block = block
+        self.encoded = 0
+        self.dropped = 0
+
+    def close(self):
+        '''
+        Stop the capture, the pending frames are still yielded.
+        '''
+        self.stream.close()
+
+    def _encode(self, frame, image):
+        return EncodedFrame(
+            frame.time, frame.index, frame.region, image.to_png(self.level)
+        )
+
+    def _result(self, future):
+        self.encoded += 1
+        return future.result()
+
+    def __iter__(self):
+        pending = deque()
+        pool = ThreadPoolExecutor(
+            self.workers, thread_name_prefix='plyer-png'
+        )
+        try:
+            for frame in self.stream:
+                while pending and pending[0].done():
+                    yield self._result(pending.popleft())
+                if len(pending) >= self.max_pending:
+                    if not self.block:
+                        self.dropped += 1
+                        continue
+                    yield self._result(pending.popleft())
+
+                # copy the frame on the capture thread, the capture buffer
+                # can be reused by the next capture
+                pending.append(pool.submit(self._encode, frame, frame.crop()))
+
+            while pending:
+                yield self._result(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+
+class CaptureStream:
+    '''
+    Iterable of the :class:`XWDImage` captures returned by `capture`
+    at most `fps` times per second, cropped to `region`. Captures whose
+    region didn't change are skipped, compared by CRC32 of bands of rows,
+    so only one capture is kept in memory at a time.
+
+    .. versionadded:: 2.2.0
+    '''
+
+    band_height = 16
+
+    def __init__(self, capture, fps, region=None):
+        self.capture = capture
+        self.fps = fps
+        self.region = region
+        self.captured = 0
+        self.skipped = 0
+        self.frames = 0
+        self.started = None
+        self._hashes = None
+        self._closed = False
+
+    @property
+    def frame_rate(self):
+        '''
+        Measured number of captures per second.
+        '''
+        if self.started is None:
+            return 0.0
+        elapsed = monotonic() - self.started
+        return self.captured / elapsed if elapsed else 0.0
+
+    def close(self):
+        '''
+        Stop the stream after the current frame.
+        '''
+        self._closed = True
+
+    def _clip(self, image):
+        if self.region is None:
+            return (0, 0, image.width, image.height)
+        x, y, width, height = self.region
+        left, top = max(x, 0), max(y, 0)
+        right = min(x + width, image.width)
+        bottom = min(y + height, image.height)
+        if right <= left or bottom <= top:
+            raise ValueError('Region {} is off the screen'.format(self.region))
+        return (left, top, right - left, bottom - top)
+
+    def _band_hashes(self, image, region):
+        x, y, width, height = region
+        size = image.bytes_per_pixel
+        bytes_per_line = image.header.bytes_per_line
+
+        hashes = []
+        for top in range(y, y + height, self.band_height):
+            crc = 0
+            for row in range(top, min(top + self.band_height, y + height)):
+                start = row * bytes_per_line + x * size
+                crc = zlib.crc32(image.pixels[start:start + width * size], crc)
+            hashes.append(crc)
+        return hashes
+
+    def __iter__(self):
+        interval = 1.0 / self.fps
+        self.started = deadline = monotonic()
+
+        while not self._closed:
+            image = self.capture()
+            timestamp = monotonic()
+            self.captured += 1
+
+            region = self._clip(image)
+            hashes = self._band_hashes(image, region)
+            previous, self._hashes = self._hashes, hashes
+            if hashes == previous:
+                self.skipped += 1
+            else:
+                previous = previous or []
+                changed = [
+                    index for index, crc in enumerate(hashes)
+                    if index >= len(previous) or previous[index] != crc
+                ]
+                self.frames += 1
+                yield ScreenFrame(
+                    timestamp, self.frames - 1, region, image, changed
+                )
+
+            deadline += interval
+            delay = deadline - monotonic()
+            if delay > 0:
+                sleep(delay)
+            else:
+                # running late, don't try to catch up
+                deadline = monotonic()
+
 
 class LinuxScreenshot(Screenshot):
-    def __init__(self, file_path=None):
-        default_path = join(
+    '''
+    Screenshot of the root window, saved in the XWD format. The window is
+    captured through MIT-SHM shared memory if available, else with ``xwd``.
+    OSError is raised if the shared memory capture fails and there's
+    no ``xwd``.
+
+    .. versionchanged:: 2.2.0
+       Added read_image(), read_array() and save_png() for decoding
+       the captured screenshot, capture_image(), capture_to_buffer(),
+       capture_stream() and capture_png_stream() support, MIT-SHM capture.
+    '''
+
+    @reify
+    def _xshm(self):
+        if not xshm.available():
+            return None
+        try:
+            return xshm.XShmCapture()
+        except OSError as exc:
+            if not whereis_exe('xwd'):
+                raise OSError(
+                    'MIT-SHM capture failed and xwd is not installed: '
+                    '{}'.format(exc)
+                ) from exc
+            return None
+
+    def capture_image(self):
+        '''
+        Take a screenshot and return it as an :class:`XWDImage`.
+        A shared memory capture is returned without copying, so its
+        pixels are valid only until the next capture.
+        '''
+        if self._xshm is not None:
+            return self._xshm.capture()
+        return XWDImage(self._capture_xwd())
+
+    def _default_file_path(self):
+        return join(
             LinuxStoragePath().get_pictures_dir(),
             'screenshot.xwd'
         )
-        super().__init__(file_path or default_path)
 
     def _capture(self):
+        if self._xshm is not None:
+            with open(self.file_path, 'wb') as fle:
+                fle.write(self._xshm.capture().dump())
+            return
+
         # call xwd and redirect bytes from stdout to file
         with open(self.file_path, 'wb') as fle:
             subprocess.call([
@@ -21,9 +302,66 @@ class LinuxScreenshot(Screenshot):
                 'xwd', '-silent', '-root',
             ], stdout=fle)
 
+    def _capture_to_buffer(self):
+        if self._xshm is not None:
+            return self._xshm.capture().dump()
+        return self._capture_xwd()
+
+    def _capture_xwd(self):
+        # read the XWD bytes straight from the pipe
+        return subprocess.run([
+            'xwd', '-silent', '-root',
+        ], stdout=subprocess.PIPE, check=True).stdout
+
+    def _capture_stream(self, fps, region=None, monitor=None):
+        if monitor is not None:
+            monitors = list_monitors()
+            if isinstance(monitor, str):
+                found = [mon for mon in monitors if mon.name == monitor]
+            else:
+                found = monitors[monitor:monitor + 1]
+            if not found:
+                raise ValueError('Unknown monitor {!r}'.format(monitor))
+
+            mon = found[0]
+            x, y, width, height = region or (0, 0, mon.width, mon.height)
+            region = (
+                mon.x + x, mon.y + y,
+                min(width, mon.width - x), min(height, mon.height - y)
+            )
+        return CaptureStream(self.capture_image, fps, region)
+
+    def _capture_png_stream(self, fps, region=None, monitor=None,
+                            workers=None, max_pending=None, level=6,
+                            block=False):
+        return EncodingPipeline(
+            self._capture_stream(fps, region, monitor),
+            workers=workers, max_pending=max_pending, level=level,
+            block=block
+        )
+
+    def read_image(self):
+        '''
+        Decode the last screenshot as an :class:`XWDImage`.
+        '''
+        return XWDImage.open(self.file_path)
+
+    def read_array(self, alpha=False):
+        '''
+        Return the last screenshot as a NumPy array of RGB(A) bytes,
+        requires NumPy.
+        '''
+        return self.read_image().to_array(alpha=alpha)
+
+    def save_png(self, path, level=6):
+        '''
+        Convert the last screenshot to a PNG file.
+        '''
+        self.read_image().save_png(path, level=level)
+
 
 def instance():
-    if whereis_exe('xwd'):
+    if whereis_exe('xwd') or xshm.available():
         return LinuxScreenshot()
     else:
         return Screenshot()
@@ -1,72 +1,504 @@
-'''
-Linux Storage Path
---------------------
-'''
-
-from plyer.facades import StoragePath
-from os.path import expanduser, dirname, abspath, join, exists
-
-# Default paths for each name
-USER_DIRS = "/.config/user-dirs.dirs"
-
-PATHS = {
-    "DESKTOP": "Desktop",
-    "DOCUMENTS": "Documents",
-    "DOWNLOAD": "Downloads",
-    "MUSIC": "Music",
-    "PICTURES": "Pictures",
-    "VIDEOS": "Videos"
-}
-
-
-class LinuxStoragePath(StoragePath):
-
-    def _get_from_user_dirs(self, name):
-        home_dir = self._get_home_dir()
-        default = join(home_dir, PATHS[name])
-        user_dirs = join(home_dir, USER_DIRS)
-        if not exists(user_dirs):
-            return default
-
-        with open(user_dirs, "r") as f:
-            for line in f.readlines():
-                if line.startswith("XDG_" + name):
-                    return line.split('"')[1]
-
-        return default
-
-    def _get_home_dir(self):
-        return expanduser('~')
-
-    def _get_external_storage_dir(self):
-        return "/media/" + self._get_home_dir().split("/")[-1]
-
-    def _get_root_dir(self):
-        return "/"
-
-    def _get_documents_dir(self):
-        directory = self._get_from_user_dirs("DOCUMENTS")
-        return directory.replace("$HOME", self._get_home_dir())
-
-    def _get_downloads_dir(self):
-        directory = self._get_from_user_dirs("DOWNLOAD")
-        return directory.replace("$HOME", self._get_home_dir())
-
-    def _get_videos_dir(self):
-        directory = self._get_from_user_dirs("VIDEOS")
-        return directory.replace("$HOME", self._get_home_dir())
-
-    def _get_music_dir(self):
-        directory = self._get_from_user_dirs("MUSIC")
-        return directory.replace("$HOME", self._get_home_dir())
-
-    def _get_pictures_dir(self):
-        directory = self._get_from_user_dirs("PICTURES")
-        return directory.replace("$HOME", self._get_home_dir())
-
-    def _get_application_dir(self):
-        return dirname(abspath(__name__))
-
-
-def instance():
-    return LinuxStoragePath()
+'''
+Linux Storage Path
+--------------------
+'''
+
+import os
+import re
+import select
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from os.path import expanduser, dirname, abspath, join, isabs, realpath
+from threading import Lock
+from time import monotonic
+
+from plyer.facades import StoragePath
+
+# File with the user directories, relative to $XDG_CONFIG_HOME
+USER_DIRS = "user-dirs.dirs"
+
+# Default paths for each name
+PATHS = {
+    "DESKTOP": "Desktop",
+    "DOCUMENTS": "Documents",
+    "DOWNLOAD": "Downloads",
+    "MUSIC": "Music",
+    "PICTURES": "Pictures",
+    "PUBLICSHARE": "Public",
+    "TEMPLATES": "Templates",
+    "VIDEOS": "Videos"
+}
+
+# e.g. XDG_DOCUMENTS_DIR="$HOME/My \"Documents\""
+USER_DIR_LINE = re.compile(
+    r'^\s*XDG_([A-Z0-9_]+)_DIR\s*=\s*"((?:[^"\\]|\\.)*)"\s*$'
+)
+
+
+# XDG base directories and their defaults relative to $HOME
+BASE_DIRS = {
+    "CACHE": ".cache",
+    "CONFIG": ".config",
+    "DATA": join(".local", "share"),
+    "STATE": join(".local", "state")
+}
+
+
+def base_dir(name):
+    '''
+    Return $XDG_<name>_HOME, or its default if it's unset or relative.
+    '''
+    path = os.environ.get('XDG_{}_HOME'.format(name), '')
+    if not isabs(path):
+        path = join(expanduser('~'), BASE_DIRS[name])
+    return path
+
+
+def config_home():
+    return base_dir("CONFIG")
+
+
+def parse_user_dirs(lines, home):
+    '''
+    Parse the lines of user-dirs.dirs into a dict of the directories
+    by their names, e.g. ``DOCUMENTS``. Only the paths relative to $HOME
+    or absolute are valid.
+    '''
+    dirs = {}
+    for line in lines:
+        match = USER_DIR_LINE.match(line)
+        if not match:
+            continue
+        name, value = match.groups()
+        value = re.sub(r'\\(.)', r'\1', value)
+        if value == '$HOME':
+            value = home
+        elif value.startswith('$HOME/'):
+            value = join(home, value[6:])
+        elif not value.startswith('/'):
+            continue
+        dirs[name] = value
+    return dirs
+
+
+class UserDirs:
+    '''
+    The user directories from user-dirs.dirs, parsed once and parsed
+    again only when the file, its location or $HOME changes. The file is
+    checked at most once per `recheck_interval` seconds.
+    '''
+
+    recheck_interval = 1.0
+
+    def __init__(self):
+        self._lock = Lock()
+        self._key = None
+        self._dirs = {}
+        self._checked = None
+
+    def get(self):
+        '''
+        Return the dict of the directories by their names.
+        '''
+        now = monotonic()
+        with self._lock:
+            if self._checked is not None \
+                    and now - self._checked < self.recheck_interval:
+                return self._dirs
+            self._checked = now
+
+            path = join(config_home(), USER_DIRS)
+            home = expanduser('~')
+            try:
+                stat = os.stat(path)
+                key = (path, home, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                key = (path, home, None, None)
+            if key == self._key:
+                return self._dirs
+
+            dirs = {}
+            if key[2] is not None:
+                try:
+                    with open(path, encoding='utf-8') as fle:
+                        dirs = parse_user_dirs(fle, home)
+                except (OSError, UnicodeDecodeError):
+                    pass
+            self._key, self._dirs = key, dirs
+            return dirs
+
+
+def unescape_mountinfo(value):
+    '''
+    Decode the octal escapes of spaces and others in a mountinfo field.
+    '''
+    return re.sub(
+        r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), value
+    )
+
+
+def parse_mountinfo(text):
+    '''
+    Parse the lines of /proc/<pid>/mountinfo into a list of dicts.
+    '''
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split()
+        if '-' not in fields:
+            continue
+        # optional fields end with "-"
+        end = fields.index('-', 6)
+        major, minor = fields[2].split(':')
+        options = fields[5].split(',')
+        mounts.append({
+            'device_number': (int(major), int(minor)),
+            'root': unescape_mountinfo(fields[3]),
+            'path': unescape_mountinfo(fields[4]),
+            'fstype': fields[end + 1],
+            'device': unescape_mountinfo(fields[end + 2]),
+            'read_only': 'ro' in options
+        })
+    return mounts
+
+
+class MountTable:
+    '''
+    The removable volumes mounted in the mount namespace of the process,
+    read from `path` and parsed again only after the kernel reports
+    a change of the mount table by polling the file.
+    '''
+
+    def __init__(self, path='/proc/self/mountinfo', sys_path='/sys'):
+        self.path = path
+        self.sys_path = sys_path
+        self._lock = Lock()
+        self._fd = None
+        self._poller = None
+        self._waiter = None
+        self._volumes = None
+        self._removable = {}
+
+    def _open(self):
+        # the kernel reports each change once per open file, so wait()
+        # gets its own one
+        pollers = []
+        for _ in range(2):
+            fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+            poller = select.poll()
+            poller.register(fd, select.POLLPRI | select.POLLERR)
+            pollers.append((fd, poller))
+        (self._fd, self._poller), (_, self._waiter) = pollers
+
+    def _read(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        data = b''.join(iter(lambda: os.read(self._fd, 65536), b''))
+        return data.decode('utf-8', 'surrogateescape')
+
+    @staticmethod
+    def _poll(poller, timeout):
+        events = poller.poll(timeout)
+        return any(
+            event & (select.POLLPRI | select.POLLERR)
+            for _, event in events
+        )
+
+    def is_removable(self, major, minor):
+        '''
+        Check whether a block device is removable or connected by USB,
+        from sysfs.
+        '''
+        key = (major, minor)
+        if key not in self._removable:
+            device = realpath(join(
+                self.sys_path, 'dev', 'block', '{}:{}'.format(major, minor)
+            ))
+            if os.path.exists(join(device, 'partition')):
+                device = dirname(device)
+            try:
+                with open(join(device, 'removable')) as fle:
+                    removable = fle.read().strip() == '1'
+            except OSError:
+                removable = False
+            self._removable[key] = removable or '/usb' in device
+        return self._removable[key]
+
+    def volumes(self):
+        '''
+        Return the mounted removable volumes.
+        '''
+        with self._lock:
+            if self._fd is None:
+                self._open()
+            elif self._volumes is not None \
+                    and not self._poll(self._poller, 0):
+                return list(self._volumes)
+
+            # devices can be replaced along with the mount table
+            self._removable.clear()
+            self._volumes = [
+                mount for mount in parse_mountinfo(self._read())
+                if mount['device_number'][0] != 0
+                and self.is_removable(*mount['device_number'])
+            ]
+            return list(self._volumes)
+
+    def wait(self, timeout=None):
+        '''
+        Wait until the mount table changes, at most `timeout` seconds.
+        Returns True if it changed.
+        '''
+        with self._lock:
+            if self._fd is None:
+                self._open()
+        return self._poll(
+            self._waiter, None if timeout is None else timeout * 1000
+        )
+
+
+class UsageScanner:
+    '''
+    Computes the space taken by directory trees, scanning the directories
+    with :func:`os.scandir` on a pool of `workers` threads. Files with
+    several hard links are counted once.
+
+    The totals of the files of each directory are cached by the modification
+    time of the directory, so a scan again reads only the directories whose
+    entries changed, the others cost a single stat(). Note that a file
+    modified in place doesn't change the time of its directory.
+
+    Directories not found by the latest scan of a tree are dropped from
+    the cache and at most `cache_size` directories are kept, the least
+    recently scanned are dropped first.
+    '''
+
+    def __init__(self, workers=None, cache_size=100000):
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def _scan_dir(self, path):
+        try:
+            return self._read_dir(path)
+        except OSError:
+            # removed or not readable anymore
+            with self._lock:
+                self._cache.pop(path, None)
+            raise
+
+    def _read_dir(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(path)
+                return cached
+
+        size = blocks = files = 0
+        subdirs, linked = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.st_nlink > 1:
+                    linked.append((
+                        stat.st_dev, stat.st_ino, stat.st_size, stat.st_blocks
+                    ))
+                else:
+                    size += stat.st_size
+                    blocks += stat.st_blocks
+                    files += 1
+
+        result = (mtime, size, blocks, files, subdirs, linked)
+        with self._lock:
+            self._cache[path] = result
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _prune(self, root, scanned):
+        # drop the removed directories of the tree
+        prefix = join(root, '')
+        with self._lock:
+            removed = [
+                path for path in self._cache
+                if path.startswith(prefix) and path not in scanned
+            ]
+            for path in removed:
+                del self._cache[path]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def usage(self, path, progress=None):
+        '''
+        Return the usage of the tree of `path`, call `progress` with
+        the partial result after each directory.
+        '''
+        totals = {
+            'size': 0, 'disk_usage': 0, 'files': 0, 'dirs': 0, 'errors': 0
+        }
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            totals.update(
+                size=stat.st_size, disk_usage=stat.st_blocks * 512, files=1
+            )
+            return totals
+
+        # hard links are resolved on this thread only
+        seen = set()
+        scanned = {path}
+        with ThreadPoolExecutor(
+                self.workers, thread_name_prefix='plyer-usage') as pool:
+            pending = {pool.submit(self._scan_dir, path)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        _, size, blocks, files, subdirs, linked = \
+                            future.result()
+                    except OSError:
+                        totals['errors'] += 1
+                        continue
+
+                    for device, inode, link_size, link_blocks in linked:
+                        if (device, inode) not in seen:
+                            seen.add((device, inode))
+                            size += link_size
+                            blocks += link_blocks
+                            files += 1
+                    totals['size'] += size
+                    totals['disk_usage'] += blocks * 512
+                    totals['files'] += files
+                    totals['dirs'] += 1
+                    scanned.update(subdirs)
+                    pending.update(
+                        pool.submit(self._scan_dir, subdir)
+                        for subdir in subdirs
+                    )
+                if progress is not None:
+                    progress(dict(totals))
+        self._prune(path, scanned)
+        return totals
+
+
+class LinuxStoragePath(StoragePath):
+    '''
+    .. versionchanged:: 2.2.0
+       The user directories are read from $XDG_CONFIG_HOME/user-dirs.dirs
+       and cached, added get_all_dirs(), the XDG base directories
+       and get_capacity(), get_removable_volumes() and usage().
+    '''
+
+    _user_dirs = UserDirs()
+    _mount_table = MountTable()
+    _usage_scanner = UsageScanner()
+    _capacities = {}
+    _capacities_lock = Lock()
+    capacity_ttl = 5.0
+    '''Seconds for which the capacity of a path is cached.
+    '''
+
+    def _get_from_user_dirs(self, name):
+        directory = self._user_dirs.get().get(name)
+        return directory or join(self._get_home_dir(), PATHS[name])
+
+    def _get_all_dirs(self):
+        dirs = self._user_dirs.get()
+        home = self._get_home_dir()
+        names = set(PATHS).union(dirs)
+        return {
+            name.lower(): dirs.get(name) or join(home, PATHS[name])
+            for name in names
+        }
+
+    def _get_home_dir(self):
+        return expanduser('~')
+
+    def _get_external_storage_dir(self):
+        return "/media/" + self._get_home_dir().split("/")[-1]
+
+    def _get_removable_volumes(self):
+        return self._mount_table.volumes()
+
+    def _usage(self, path, progress=None):
+        return self._usage_scanner.usage(path, progress)
+
+    def wait_for_media_change(self, timeout=None):
+        '''
+        Block until a volume is mounted or unmounted, at most `timeout`
+        seconds. Returns True if the mount table changed.
+        '''
+        return self._mount_table.wait(timeout)
+
+    def _get_root_dir(self):
+        return "/"
+
+    def _get_documents_dir(self):
+        return self._get_from_user_dirs("DOCUMENTS")
+
+    def _get_downloads_dir(self):
+        return self._get_from_user_dirs("DOWNLOAD")
+
+    def _get_videos_dir(self):
+        return self._get_from_user_dirs("VIDEOS")
+
+    def _get_music_dir(self):
+        return self._get_from_user_dirs("MUSIC")
+
+    def _get_pictures_dir(self):
+        return self._get_from_user_dirs("PICTURES")
+
+    def _get_application_dir(self):
+        return dirname(abspath(__name__))
+
+    def _get_cache_dir(self):
+        return base_dir("CACHE")
+
+    def _get_config_dir(self):
+        return base_dir("CONFIG")
+
+    def _get_data_dir(self):
+        return base_dir("DATA")
+
+    def _get_state_dir(self):
+        return base_dir("STATE")
+
+    def _get_runtime_dir(self):
+        path = os.environ.get('XDG_RUNTIME_DIR', '')
+        if isabs(path):
+            return path
+        # the usual location, created by systemd-logind
+        path = '/run/user/{}'.format(os.getuid())
+        return path if os.path.isdir(path) else None
+
+    def _get_capacity(self, path):
+        now = monotonic()
+        with self._capacities_lock:
+            cached = self._capacities.get(path)
+        if cached is not None and now - cached[0] < self.capacity_ttl:
+            return dict(cached[1])
+
+        stat = os.statvfs(path)
+        capacity = {
+            'total': stat.f_blocks * stat.f_frsize,
+            'free': stat.f_bfree * stat.f_frsize,
+            'available': stat.f_bavail * stat.f_frsize
+        }
+        with self._capacities_lock:
+            capacities = self._capacities
+            capacities[path] = (now, capacity)
+            if len(capacities) > 256:
+                for key, (checked, _) in list(capacities.items()):
+                    if now - checked >= self.capacity_ttl:
+                        del capacities[key]
+        return dict(capacity)
+
+
+def instance():
+    return LinuxStoragePath()
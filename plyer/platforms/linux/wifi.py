@@ -5,16 +5,260 @@
    backends is not provided yet.
 '''
 
+import re
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from subprocess import Popen, PIPE, call
+from os.path import join
+from threading import Event, Lock, Thread
+from time import monotonic, time
 from plyer.facades import Wifi
 from plyer.utils import whereis_exe, deprecated
 
-try:
-    import wifi
-except ModuleNotFoundError as err:
-    raise ModuleNotFoundError(
-            "python-wifi not installed. try:" +
-            "`pip install --user wifi`.") from err
+#: a single field of a line in ``nmcli --terse`` output, where colons
+#: and backslashes inside of the values are escaped with a backslash
+TERSE_FIELD = r'((?:[^\\:]|\\.)*)'
+TERSE_ESCAPE = re.compile(r'\\(.)')
+
+
+@lru_cache()
+def _terse_record(fields):
+    '''
+    Create a record type and a line pattern for a tuple of nmcli fields.
+    '''
+    record = namedtuple('NMCLIRecord', [
+        field.replace('-', '_').replace('.', '_')
+        for field in fields
+    ], rename=True)
+    pattern = re.compile(':'.join([TERSE_FIELD] * len(fields)))
+    return record, pattern
+
+
+def _unescape(value):
+    if '\\' in value:
+        return TERSE_ESCAPE.sub(r'\1', value)
+    return value
+
+
+def parse_terse(lines, fields):
+    '''
+    Parse ``nmcli --terse`` tabular output line by line and yield
+    a record (named tuple) for each line. Lines not matching the
+    requested `fields` are skipped.
+
+    `lines` can be any iterable of strings, e.g. a text stream
+    of a running nmcli process.
+
+    .. versionadded:: 2.2.0
+    '''
+    record, pattern = _terse_record(tuple(fields))
+    for line in lines:
+        match = pattern.fullmatch(line.rstrip('\n'))
+        if match is None:
+            continue
+        yield record._make(map(_unescape, match.groups()))
+
+
+def parse_multiline(lines, fields):
+    '''
+    Parse ``nmcli --terse --mode multiline`` output, where each value
+    is on a separate ``FIELD:value`` line, and yield a record
+    (named tuple) for each complete block of `fields`.
+
+    .. versionadded:: 2.2.0
+    '''
+    fields = tuple(fields)
+    record, _ = _terse_record(fields)
+    index = {field: idx for idx, field in enumerate(fields)}
+    values = [None] * len(fields)
+    found = 0
+
+    for line in lines:
+        name, sep, value = line.rstrip('\n').partition(':')
+        idx = index.get(name)
+        if not sep or idx is None:
+            continue
+        if values[idx] is not None:
+            # the field repeats, previous block was incomplete
+            values = [None] * len(fields)
+            found = 0
+        values[idx] = _unescape(value)
+        found += 1
+        if found == len(fields):
+            yield record._make(values)
+            values = [None] * len(fields)
+            found = 0
+
+
+def import_wifi():
+    '''
+    Import python-wifi package used only by the deprecated backend.
+    '''
+    try:
+        import wifi
+    except ModuleNotFoundError as err:
+        raise ModuleNotFoundError(
+                "python-wifi not installed. try:" +
+                "`pip install --user wifi`.") from err
+    return wifi
+
+
+def nmcli_terse(fields, *args, multiline=False):
+    '''
+    Run ``nmcli --terse --fields <fields> <args>`` and yield
+    the parsed records while nmcli is printing them. Set `multiline`
+    for commands printing ``FIELD:value`` lines.
+
+    .. versionadded:: 2.2.0
+    '''
+    proc = Popen(
+        ['nmcli', '--terse', '--fields', ','.join(fields)] + list(args),
+        stdout=PIPE, encoding='utf-8'
+    )
+    parse = parse_multiline if multiline else parse_terse
+    with proc:
+        yield from parse(proc.stdout, fields)
+
+
+LinkSample = namedtuple(
+    'LinkSample', ('time', 'up', 'link', 'level', 'noise')
+)
+
+
+class WifiLinkMonitor:
+    '''
+    Monitor of the connected link of a WiFi interface.
+
+    Link quality, signal level and noise are sampled `rate` times per second
+    from `/proc/net/wireless` and the operational state from sysfs. Both
+    files are kept open and only re-read, the last `size` samples are kept
+    in `samples`. Noise is `None` if the driver doesn't report it.
+
+    If the files can't be read by the monitor thread, e.g. the interface
+    was removed, a sample with `up` False and no values is stored, the
+    error is kept in `error` and the files are opened again for the next
+    sample.
+
+    .. versionadded:: 2.2.0
+    '''
+
+    proc_path = '/proc/net/wireless'
+    sysfs_path = '/sys/class/net'
+
+    def __init__(self, interface, rate=1.0, size=60):
+        self.interface = interface
+        self.rate = rate
+        self.samples = deque(maxlen=size)
+        self._thresholds = []
+        self._files = None
+        self._thread = None
+        self._stop = Event()
+        self.error = None
+        '''The last error of the monitor thread, None once a sample
+        is read again.
+        '''
+
+    def add_threshold(self, field, value, callback):
+        '''
+        Call `callback(sample, field, value, rising)` from the monitor
+        thread each time `field` of a sample crosses `value`.
+        '''
+        self._thresholds.append([field, value, callback, None])
+
+    def sample(self):
+        '''
+        Read a single sample, store it and return it. Returns `None`
+        if the interface isn't listed as a wireless one.
+        '''
+        if self._files is None:
+            proc = open(self.proc_path)
+            try:
+                operstate = open(
+                    join(self.sysfs_path, self.interface, 'operstate')
+                )
+            except OSError:
+                proc.close()
+                raise
+            self._files = (proc, operstate)
+        proc, operstate = self._files
+
+        proc.seek(0)
+        values = None
+        for line in proc:
+            name, sep, rest = line.partition(':')
+            if sep and name.strip() == self.interface:
+                # status, link, level, noise, ...; updated values end with '.'
+                values = [
+                    float(value.rstrip('.')) for value in rest.split()[1:4]
+                ]
+                break
+        if values is None:
+            return None
+
+        operstate.seek(0)
+        link, level, noise = values
+        sample = LinkSample(
+            time=time(), up=operstate.read().strip() == 'up',
+            link=link, level=level, noise=None if noise == -256 else noise
+        )
+        self._store(sample)
+        return sample
+
+    def _store(self, sample):
+        self.samples.append(sample)
+        self._check_thresholds(sample)
+
+    def _check_thresholds(self, sample):
+        for threshold in self._thresholds:
+            field, value, callback, above = threshold
+            current = getattr(sample, field)
+            if current is None:
+                continue
+            threshold[3] = current >= value
+            if above is not None and above != threshold[3]:
+                callback(sample, field, value, threshold[3])
+
+    def start(self):
+        '''
+        Start sampling in a background thread.
+        '''
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''
+        Stop sampling and close the monitored files.
+        '''
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._close_files()
+
+    def _close_files(self):
+        if self._files is not None:
+            for fle in self._files:
+                fle.close()
+            self._files = None
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except OSError as exc:
+                # reopened for the next sample, the interface can be back
+                self.error = exc
+                self._close_files()
+                self._store(LinkSample(time(), False, None, None, None))
+            else:
+                self.error = None
+            if self._stop.wait(1.0 / self.rate):
+                break
 
 
 class NMCLIWifi(Wifi):
@@ -22,6 +266,20 @@ class NMCLIWifi(Wifi):
     .. versionadded:: 1.4.0
     '''
 
+    min_rescan_interval = 10
+    '''Minimum number of seconds between two rescans of the same interface
+    requested via `start_scanning_async`. Requests arriving sooner get
+    the result of the previous scan.
+    '''
+
+    scan_fields = (
+        'SSID', 'BSSID', 'MODE', 'CHAN', 'FREQ',
+        'BARS', 'RATE', 'SIGNAL', 'SECURITY', 'DEVICE'
+    )
+    '''Fields of the scanned networks requested from nmcli. `DEVICE` tags
+    each network with the interface that saw it.
+    '''
+
     def __init__(self, *args, **kwargs):
         '''
         .. versionadded:: 1.4.0
@@ -29,6 +287,12 @@ class NMCLIWifi(Wifi):
 
         super().__init__(*args, **kwargs)
         self.names = {}
+        self.bssids = {}
+        self._profiles = None
+        self._scan_lock = Lock()
+        self._scan_futures = {}
+        self._scan_results = {}
+        self._default_interface = None
 
     @property
     def interfaces(self):
@@ -41,26 +305,12 @@ class NMCLIWifi(Wifi):
         if not self._is_enabled():
             self._enable()
 
-        # fetch the devices
-        proc = Popen([
-            'nmcli', '--terse',
-            '--fields', 'DEVICE,TYPE',
-            'device'
-        ], stdout=PIPE)
-        lines = proc.communicate()[0].decode('utf-8').splitlines()
-
-        # filter devices by type
-        interfaces = []
-        for line in lines:
-            # bad escape from nmcli's side :<
-            line = line.replace('\\:', '$$')
-            device, dtype = line.split(':')
-            if dtype != 'wifi':
-                continue
-            interfaces.append(device.replace('$$', ':'))
-
-        # return wifi interfaces
-        return interfaces
+        # fetch the devices and filter them by type
+        return [
+            device.DEVICE
+            for device in nmcli_terse(('DEVICE', 'TYPE'), 'device')
+            if device.TYPE == 'wifi'
+        ]
 
     def _is_enabled(self):
         '''
@@ -91,26 +341,18 @@ class NMCLIWifi(Wifi):
             interface = self.interfaces[0]
 
         # fetch all devices
-        proc = Popen([
-            'nmcli', '--terse',
-            '--fields', 'DEVICE,TYPE,STATE',
-            'device'
-        ], stdout=PIPE)
-        lines = proc.communicate()[0].decode('utf-8').splitlines()
+        devices = nmcli_terse(('DEVICE', 'TYPE', 'STATE'), 'device')
 
         # filter by wifi type and interface
         connected = False
-        for line in lines:
-            line = line.replace('\\:', '$$')
-            device, dtype, state = line.split(':')
-            device = device.replace('$$', ':')
-            if dtype != 'wifi':
+        for device in devices:
+            if device.TYPE != 'wifi':
                 continue
 
-            if device != interface:
+            if device.DEVICE != interface:
                 continue
 
-            if state == 'connected':
+            if device.STATE == 'connected':
                 connected = True
 
         return connected
@@ -118,42 +360,152 @@ class NMCLIWifi(Wifi):
     def _start_scanning(self, interface=None):
         '''
         Start scanning for available Wi-Fi networks
-        for the specified interface.
+        for the specified interface. Pass ``'all'`` to scan with
+        all the WiFi interfaces concurrently. Found networks are also
+        available by their BSSID in `bssids`.
 
         .. versionadded:: 1.4.0
            Tested with nmcli 1.2.6.
+
+        .. versionchanged:: 2.2.0
+           Added ``'all'`` interface. Shares the scan in flight and
+           the recent results with `start_scanning_async`.
+        '''
+        self._start_scanning_async(interface).result()
+
+    def _start_scanning_async(self, interface=None, callback=None):
+        '''
+        Start scanning in a background thread. Concurrent requests
+        for the same interface share the scan in flight and a rescan
+        is done at most once per `min_rescan_interval` seconds.
+
+        .. versionadded:: 2.2.0
+        '''
+        # the default interface shares the scans requested by its name
+        interface = interface or self._get_default_interface()
+        with self._scan_lock:
+            future = self._scan_futures.get(interface)
+            if future is None:
+                future = Future()
+                last = self._scan_results.get(interface)
+                if last and monotonic() - last[0] < self.min_rescan_interval:
+                    future.set_result(dict(last[1]))
+                else:
+                    self._scan_futures[interface] = future
+                    Thread(
+                        target=self._scan_worker,
+                        args=(interface, future),
+                        daemon=True
+                    ).start()
+
+        if callback:
+            future.add_done_callback(callback)
+        return future
+
+    def _get_default_interface(self):
+        '''
+        Return the first WiFi interface, looked up at most once
+        per `min_rescan_interval` seconds.
+
+        .. versionadded:: 2.2.0
+        '''
+        with self._scan_lock:
+            cached = self._default_interface
+        if cached and monotonic() - cached[0] < self.min_rescan_interval:
+            return cached[1]
+
+        if not self._is_enabled():
+            self._enable()
+        interface = self.interfaces[0]
+        with self._scan_lock:
+            self._default_interface = (monotonic(), interface)
+        return interface
+
+    def _scan_worker(self, interface, future):
+        '''
+        Run a scan for `start_scanning_async` and resolve its future.
+
+        .. versionadded:: 2.2.0
+        '''
+        try:
+            result = self._scan(interface)
+        except Exception as exc:
+            with self._scan_lock:
+                del self._scan_futures[interface]
+            future.set_exception(exc)
+            return
+
+        with self._scan_lock:
+            self.names.update(result)
+            self._scan_results[interface] = (monotonic(), result)
+            del self._scan_futures[interface]
+        future.set_result(dict(result))
+
+    def _scan(self, interface=None):
+        '''
+        Rescan and return the found networks as a dictionary
+        with SSID as a key and a dictionary of `scan_fields` as a value.
+
+        .. versionadded:: 2.2.0
         '''
         if not self._is_enabled():
             self._enable()
         if not interface:
             interface = self.interfaces[0]
 
+        if interface == 'all':
+            # scan with every radio at once, the slowest one decides
+            interfaces = self.interfaces
+            with ThreadPoolExecutor(max(len(interfaces), 1)) as pool:
+                scans = list(pool.map(self._scan_interface, interfaces))
+        else:
+            scans = [self._scan_interface(interface)]
+
+        # merge networks seen by multiple radios, keep the strongest signal
+        bssids = {}
+        for network in chain.from_iterable(scans):
+            seen = bssids.get(network.BSSID)
+            if seen is None or int(network.SIGNAL) > int(seen.SIGNAL):
+                bssids[network.BSSID] = network
+        self.bssids.update(bssids)
+
+        networks = {}
+        for network in bssids.values():
+            seen = networks.get(network.SSID)
+            if seen is None or int(network.SIGNAL) > int(seen.SIGNAL):
+                networks[network.SSID] = network
+        # names keep the dictionaries of the previous versions
+        return {
+            ssid: dict(network._asdict())
+            for ssid, network in networks.items()
+        }
+
+    def _scan_interface(self, interface):
+        '''
+        Rescan a single interface and return a list of the found networks.
+
+        .. versionadded:: 2.2.0
+        '''
         # force rescan for fresh data
         call(['nmcli', 'device', 'wifi', 'rescan', 'ifname', interface])
 
-        # get properties
-        fields = [
-            'SSID', 'BSSID', 'MODE', 'CHAN', 'FREQ',
-            'BARS', 'RATE', 'SIGNAL', 'SECURITY'
-        ]
-
         # fetch all networks for interface
-        output = Popen([
-            'nmcli', '--terse',
-            '--fields', ','.join(fields),
+        return list(nmcli_terse(
+            self.scan_fields,
             'device', 'wifi', 'list', 'ifname', interface
-        ], stdout=PIPE).communicate()[0].decode('utf-8')
+        ))
 
-        # parse output
-        for line in output.splitlines():
-            line = line.replace('\\:', '$$')
-            row = {
-                field: value
-                for field, value in zip(fields, line.split(':'))
-            }
+    def _monitor_link(self, interface=None, rate=1.0, size=60):
+        '''
+        Start a :class:`WifiLinkMonitor` for a specified interface.
 
-            row['BSSID'] = row['BSSID'].replace('$$', ':')
-            self.names[row['SSID']] = row
+        .. versionadded:: 2.2.0
+        '''
+        if not interface:
+            interface = self.interfaces[0]
+        monitor = WifiLinkMonitor(interface, rate=rate, size=size)
+        monitor.start()
+        return monitor
 
     def _get_network_info(self, name):
         '''
@@ -165,17 +517,18 @@ class NMCLIWifi(Wifi):
         if not self.names:
             self._start_scanning()
 
+        network = self.names[name]
         ret_list = {}
-        ret_list['ssid'] = self.names[name]['SSID']
-        ret_list['signal'] = self.names[name]['SIGNAL']
+        ret_list['ssid'] = network['SSID']
+        ret_list['signal'] = network['SIGNAL']
 
-        bars = len(self.names[name]['BARS'])
+        bars = len(network['BARS'])
         ret_list['quality'] = '{}/100'.format(bars / 5.0 * 100)
-        ret_list['frequency'] = self.names[name]['FREQ']
-        ret_list['bitrates'] = self.names[name]['RATE']
+        ret_list['frequency'] = network['FREQ']
+        ret_list['bitrates'] = network['RATE']
 
         # wpa1, wpa2, wpa1 wpa2, wep, (none), perhaps something else
-        security = self.names[name]['SECURITY'].lower()
+        security = network['SECURITY'].lower()
         ret_list['encrypted'] = True
         if 'wpa2' in security:
             # wpa2, wpa2+wpa1
@@ -190,9 +543,9 @@ class NMCLIWifi(Wifi):
         else:
             ret_list['encryption_type'] = security
 
-        ret_list['channel'] = int(self.names[name]['CHAN'])
-        ret_list['address'] = self.names[name]['BSSID']
-        ret_list['mode'] = self.names[name]['MODE']
+        ret_list['channel'] = int(network['CHAN'])
+        ret_list['address'] = network['BSSID']
+        ret_list['mode'] = network['MODE']
         return ret_list
 
     def _get_available_wifi(self):
@@ -215,13 +568,29 @@ class NMCLIWifi(Wifi):
             - parameters: dict
                 - password: string or None
 
+        A saved connection profile for the SSID is activated directly,
+        a full connect (rescan and creating or updating the profile)
+        is done only if there's none or its activation fails.
+
         .. versionadded:: 1.4.0
            Tested with nmcli 1.2.6.
+
+        .. versionchanged:: 2.2.0
+           Reuse saved connection profiles.
         '''
         self._enable()
         if not interface:
             interface = self.interfaces[0]
 
+        uuid = self._get_profiles().get(network)
+        if uuid is not None and call([
+            'nmcli', 'connection', 'up', 'uuid', uuid, 'ifname', interface
+        ]) == 0:
+            return
+
+        # the profile is going to be created or updated
+        self._profiles = None
+
         password = parameters.get('password')
         command = [
             'nmcli', 'device', 'wifi', 'connect', network,
@@ -231,6 +600,35 @@ class NMCLIWifi(Wifi):
             command += ['password', password]
         call(command)
 
+    def _get_profiles(self):
+        '''
+        Return a cached dictionary of saved WiFi connection profiles
+        with SSID as a key and profile UUID as a value.
+
+        .. versionadded:: 2.2.0
+        '''
+        if self._profiles is not None:
+            return self._profiles
+
+        uuids = [
+            profile.UUID
+            for profile in nmcli_terse(('UUID', 'TYPE'), 'connection', 'show')
+            if profile.TYPE in ('802-11-wireless', 'wifi')
+        ]
+
+        profiles = {}
+        if uuids:
+            # fetch SSIDs of all the profiles with a single nmcli call
+            settings = nmcli_terse(
+                ('connection.uuid', '802-11-wireless.ssid'),
+                'connection', 'show', *uuids, multiline=True
+            )
+            for uuid, ssid in settings:
+                profiles.setdefault(ssid, uuid)
+
+        self._profiles = profiles
+        return profiles
+
     def _disconnect(self, interface=None):
         '''
         Disconnect a specific interface from a WiFi network.
@@ -290,10 +688,14 @@ class LinuxWifi(Wifi):
     def __init__(self, *args, **kwargs):
         '''
         .. versionadded:: 1.4.0
+
+        .. versionchanged:: 2.2.0
+           python-wifi is imported only when this backend is created.
         '''
 
         super().__init__(*args, **kwargs)
         self.names = {}
+        self._wifi = import_wifi()
 
     @property
     def interfaces(self):
@@ -372,7 +774,7 @@ class LinuxWifi(Wifi):
             interface = self.interfaces[0]
 
         if self._is_enabled():
-            list_ = list(wifi.Cell.all(interface))
+            list_ = list(self._wifi.Cell.all(interface))
             for i in range(len(list_)):
                 self.names[list_[i].ssid] = list_[i]
         else:
@@ -429,7 +831,7 @@ class LinuxWifi(Wifi):
         finally:
             password = parameters['password']
             cell = self.names[network]
-            result = wifi.Scheme.for_cell(
+            result = self._wifi.Scheme.for_cell(
                 interface, network, cell, password
             )
         return result
@@ -6,12 +6,28 @@ Common objects for testing
   only on a specific platform (see `plyer.utils.platform`).
 * :func:`platform_import` - manual import of a platform specific class instead
   of using `plyer.facades.*` proxies.
+* :func:`imported_modules` - list modules imported by a statement
+  in a fresh interpreter.
+* :func:`private_session_bus` - run fake D-Bus services on a private
+  session bus.
 '''
 
+import atexit
+import json
+import sys
 import traceback
-from os import sep
-from os.path import normpath, splitdrive
-from plyer.utils import platform as plyer_platform
+from contextlib import contextmanager
+from functools import lru_cache
+from os import environ, pathsep, sep
+from os.path import abspath, dirname, join, normpath, splitdrive
+from queue import Queue
+from subprocess import DEVNULL, PIPE, Popen, check_output
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest.mock import patch
+from plyer.utils import (
+    module_available, platform as plyer_platform, whereis_exe
+)
 
 
 class PlatformTest:
@@ -74,3 +90,111 @@ def splitpath(path):
             path = path[1:]
         path = [drive, ] + normpath(path).split(sep)
     return path
+
+
+def imported_modules(statement, stubs=()):
+    '''
+    Run a statement in a fresh interpreter and return a set of names
+    of the modules it imported. Empty modules named in `stubs` are made
+    available, so that optional dependencies look installed.
+    '''
+    code = (
+        'import sys\n'
+        'before = set(sys.modules)\n'
+        '{}\n'
+        'print("\\n".join(set(sys.modules) - before))\n'
+    ).format(statement)
+
+    with TemporaryDirectory() as temp:
+        for stub in stubs:
+            open(join(temp, stub + '.py'), 'w').close()
+
+        paths = [dirname(dirname(dirname(abspath(__file__)))), temp]
+        if environ.get('PYTHONPATH'):
+            paths.append(environ['PYTHONPATH'])
+        env = dict(environ, PYTHONPATH=pathsep.join(paths))
+        output = check_output([sys.executable, '-c', code], env=env)
+    return set(output.decode('utf-8').split())
+
+
+def session_bus_missing():
+    '''
+    Return why :func:`private_session_bus` can't run, or None if it can.
+    '''
+    if not whereis_exe('dbus-daemon'):
+        return 'dbus-daemon not found'
+    if not (module_available('dbus') and module_available('gi')):
+        return 'dbus-python or PyGObject not installed'
+    return None
+
+
+class FakeService:
+    '''
+    A running service of :mod:`plyer.tests.dbus_services`.
+    '''
+
+    def __init__(self, name, env):
+        self.process = Popen(
+            [sys.executable, '-m', 'plyer.tests.dbus_services', name],
+            stdout=PIPE, env=env, universal_newlines=True
+        )
+        self.calls = Queue()
+        Thread(target=self._read, daemon=True).start()
+        if self.next_call() != ['ready']:
+            raise RuntimeError('Fake service {} failed'.format(name))
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.calls.put(json.loads(line))
+
+    def next_call(self, timeout=5):
+        '''
+        Return the next recorded ``[method, signature, *args]`` call.
+        '''
+        return self.calls.get(timeout=timeout)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+@lru_cache()
+def _session_bus_address():
+    # libdbus reads the session bus address once per process,
+    # a single bus daemon is shared by all the tests
+    daemon = Popen(
+        ['dbus-daemon', '--session', '--nofork', '--print-address'],
+        stdout=PIPE, stderr=DEVNULL, universal_newlines=True
+    )
+    atexit.register(daemon.wait)
+    atexit.register(daemon.terminate)
+    address = daemon.stdout.readline().strip()
+    daemon.stdout.close()
+    return address
+
+
+@contextmanager
+def private_session_bus(*services):
+    '''
+    Start the named fake services of :mod:`plyer.tests.dbus_services`
+    on a private session bus and make it the session bus of this process.
+    Yields a dictionary of :class:`FakeService`.
+    '''
+    address = _session_bus_address()
+    root = dirname(dirname(dirname(abspath(__file__))))
+    env = dict(
+        environ, DBUS_SESSION_BUS_ADDRESS=address,
+        PYTHONPATH=pathsep.join(
+            [root] + environ.get('PYTHONPATH', '').split(pathsep)
+        ).rstrip(pathsep)
+    )
+    running = {}
+    try:
+        for name in services:
+            running[name] = FakeService(name, env)
+        with patch.dict(environ, DBUS_SESSION_BUS_ADDRESS=address):
+            yield running
+    finally:
+        for service in running.values():
+            service.stop()
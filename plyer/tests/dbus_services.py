@@ -0,0 +1,132 @@
+'''
+Fake D-Bus services
+===================
+
+Stand-ins of the desktop services used by the Linux platform modules,
+for tests on a private session bus, see
+:func:`plyer.tests.common.private_session_bus`. Run in a separate process::
+
+    python -m plyer.tests.dbus_services <service>
+
+Every method call is printed to stdout as a JSON list of the method name,
+the signature of the arguments and the arguments. Signals are sent only
+to the connection which made the call, like the portal does.
+'''
+
+import json
+import sys
+from itertools import count
+
+import dbus
+import dbus.service
+from dbus.lowlevel import SignalMessage
+from dbus.mainloop.glib import DBusGMainLoop
+from gi.repository import GLib
+
+
+def record(method, message, *args):
+    print(json.dumps([method, message.get_signature()] + list(args)))
+    sys.stdout.flush()
+
+
+def unicast(obj, interface, signal, destination, signature, *args):
+    '''
+    Send a signal of `obj` only to the `destination` connection.
+    '''
+    message = SignalMessage(obj.__dbus_object_path__, interface, signal)
+    message.set_destination(destination)
+    message.append(*args, signature=signature)
+    obj.connection.send_message(message)
+
+
+class Portal(dbus.service.Object):
+    '''
+    org.freedesktop.portal.Notification, invokes the first button
+    of each added notification.
+    '''
+
+    bus_name = 'org.freedesktop.portal.Desktop'
+    object_path = '/org/freedesktop/portal/desktop'
+    interface = 'org.freedesktop.portal.Notification'
+
+    @dbus.service.method(
+        interface, in_signature='sa{sv}', out_signature='',
+        sender_keyword='sender', message_keyword='message'
+    )
+    def AddNotification(self, handle, notification, sender, message):
+        record('AddNotification', message, handle, notification)
+        for button in notification.get('buttons', [])[:1]:
+            unicast(
+                self, self.interface, 'ActionInvoked', sender, 'ssav',
+                handle, button['action'], dbus.Array([], signature='v')
+            )
+
+    @dbus.service.method(
+        interface, in_signature='s', out_signature='',
+        message_keyword='message'
+    )
+    def RemoveNotification(self, handle, message):
+        record('RemoveNotification', message, handle)
+
+
+class Notifications(dbus.service.Object):
+    '''
+    org.freedesktop.Notifications, invokes the first action of each
+    notification and reports the closed ones.
+    '''
+
+    bus_name = 'org.freedesktop.Notifications'
+    object_path = '/org/freedesktop/Notifications'
+    interface = 'org.freedesktop.Notifications'
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._ids = count(1)
+
+    @dbus.service.method(
+        interface, in_signature='susssasa{sv}i', out_signature='u',
+        sender_keyword='sender', message_keyword='message'
+    )
+    def Notify(self, app_name, replaces_id, app_icon, summary, body,
+               actions, hints, timeout, sender, message):
+        record(
+            'Notify', message, app_name, replaces_id, app_icon, summary,
+            body, actions, hints, timeout
+        )
+        handle = replaces_id or next(self._ids)
+        if actions:
+            unicast(
+                self, self.interface, 'ActionInvoked', sender, 'us',
+                handle, actions[0]
+            )
+        return handle
+
+    @dbus.service.method(
+        interface, in_signature='u', out_signature='',
+        sender_keyword='sender', message_keyword='message'
+    )
+    def CloseNotification(self, handle, sender, message):
+        record('CloseNotification', message, handle)
+        # 3 - closed by a call to CloseNotification
+        unicast(
+            self, self.interface, 'NotificationClosed', sender, 'uu',
+            handle, 3
+        )
+
+
+SERVICES = {'portal': Portal, 'notifications': Notifications}
+
+
+def main(name):
+    service = SERVICES[name]
+    DBusGMainLoop(set_as_default=True)
+    bus = dbus.SessionBus()
+    bus_name = dbus.service.BusName(service.bus_name, bus)
+    service(bus_name, service.object_path)
+    print(json.dumps(['ready']))
+    sys.stdout.flush()
+    GLib.MainLoop().run()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
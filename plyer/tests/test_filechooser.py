@@ -0,0 +1,288 @@
+'''
+TestFileChooser
+===============
+
+Tested platforms:
+
+* Linux
+'''
+
+import os
+import sys
+import unittest
+from time import sleep, time
+from unittest.mock import ANY, Mock, patch
+
+from plyer.tests.common import PlatformTest, platform_import
+
+
+def fake_chooser(script, **kwargs):
+    '''
+    Return a Linux SubprocessFileChooser running a Python script
+    instead of a dialog back-end.
+    '''
+    module = platform_import(platform='linux', module_name='filechooser')
+
+    class FakeChooser(module.SubprocessFileChooser):
+        def _gen_cmdline(self):
+            return [sys.executable, '-c', script]
+
+    return FakeChooser(**kwargs)
+
+
+def mocked_dbus():
+    '''
+    Create a mocked dbus module with the types converting to plain Python
+    values and a listener connected to the mocked session bus.
+    '''
+    def variant(value, signature=None, variant_level=0):
+        return value
+
+    interface = Mock()
+    session_bus = Mock(get_unique_name=Mock(return_value=':1.42'))
+    dbus = Mock(
+        Interface=Mock(return_value=interface),
+        Dictionary=Mock(side_effect=lambda *args, **kwargs: dict(args[0])),
+        Array=Mock(side_effect=lambda *args, **kwargs: list(args[0])),
+        Struct=Mock(side_effect=lambda *args, **kwargs: tuple(args[0])),
+        String=Mock(side_effect=variant), Boolean=Mock(side_effect=variant),
+        UInt32=Mock(side_effect=variant), ByteArray=Mock(side_effect=variant),
+        exceptions=Mock(DBusException=type('DBusException', (Exception, ), {}))
+    )
+    listener = Mock(bus=session_bus)
+    return dbus, listener, interface
+
+
+class TestFileChooser(unittest.TestCase):
+    '''
+    TestCase for plyer.filechooser.
+    '''
+
+    @PlatformTest('linux')
+    def test_filechooser_selection(self):
+        '''
+        Test the selection is read from the back-end output.
+        '''
+        selected = []
+        chooser = fake_chooser(
+            'print("/tmp/a|/tmp/\\u00e9")', on_selection=selected.append
+        )
+        self.assertEqual(chooser.run(), ['/tmp/a', '/tmp/é'])
+        self.assertEqual(selected, [['/tmp/a', '/tmp/é']])
+
+        chooser = fake_chooser('import sys; sys.exit(1)')
+        self.assertIsNone(chooser.run())
+
+    @PlatformTest('linux')
+    def test_filechooser_stream(self):
+        '''
+        Test the selection is split while it's read, also when
+        a separator or a path spans several chunks.
+        '''
+        module = platform_import(platform='linux', module_name='filechooser')
+        chooser = module.YADFileChooser()
+        paths = ['/tmp/file{}|x'.format(i) for i in range(1000)]
+        output = chooser.separator.join(paths) + '\n'
+        chunks = [output[i:i + 7] for i in range(0, len(output), 7)]
+        self.assertEqual(list(chooser._iter_paths(iter(chunks))), paths)
+
+        chooser = fake_chooser(
+            'import sys\n'
+            'for i in range(20000):\n'
+            '    sys.stdout.write("/tmp/dir/file{}|".format(i))\n'
+        )
+        stream = chooser.iter_selection()
+        self.assertIsNone(chooser._process)
+        self.assertEqual(next(stream), '/tmp/dir/file0')
+        self.assertEqual(sum(1 for _ in stream), 19999)
+        self.assertEqual(chooser._process.returncode, 0)
+
+    @PlatformTest('linux')
+    def test_filechooser_async(self):
+        '''
+        Test run_async() resolves a Future to the selection.
+        '''
+        future = fake_chooser('print("/tmp/a")').run_async()
+        self.assertEqual(future.result(timeout=10), ['/tmp/a'])
+
+    @PlatformTest('linux')
+    def test_filechooser_async_cancel(self):
+        '''
+        Test cancelling the Future closes the dialog.
+        '''
+        chooser = fake_chooser('import time; time.sleep(30)')
+        future = chooser.run_async()
+        start = time()
+        while chooser._process is None:
+            self.assertLess(time() - start, 10)
+            sleep(0.01)
+
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.cancelled())
+        chooser._process.wait(timeout=10)
+        self.assertNotEqual(chooser._process.returncode, 0)
+
+        # a late result doesn't overwrite the cancellation
+        future.resolve(['/tmp/a'])
+        self.assertTrue(future.cancelled())
+
+        # a dialog cancelled before it was started is never opened
+        chooser = fake_chooser('print("/tmp/a")')
+        chooser.terminate()
+        self.assertIsNone(chooser.run())
+        self.assertIsNone(chooser._process)
+
+    @PlatformTest('linux')
+    def test_filechooser_desktop_detection(self):
+        '''
+        Test the back-end is detected on first use only and can be
+        refreshed.
+        '''
+        module = platform_import(platform='linux', module_name='filechooser')
+        module.LinuxFileChooser.refresh_desktop()
+        found = {'/usr/bin/zenity'}
+
+        def whereis_exe(name):
+            paths = ['/usr/bin/' + name]
+            return next((pth for pth in paths if pth in found), None)
+
+        with patch.object(module, 'whereis_exe', side_effect=whereis_exe) \
+                as lookup, patch.dict('os.environ', {}, clear=True):
+            chooser = module.instance()
+            lookup.assert_not_called()
+
+            self.assertEqual(chooser.desktop, 'gnome')
+            self.assertEqual(module.instance().desktop, 'gnome')
+            self.assertEqual(lookup.call_count, 2)
+
+            cmdline = module.ZenityFileChooser(mode='open')._gen_cmdline()
+            self.assertEqual(cmdline[0], '/usr/bin/zenity')
+            self.assertEqual(lookup.call_count, 2)
+
+            found.add('/usr/bin/yad')
+            self.assertEqual(chooser.desktop, 'gnome')
+            module.LinuxFileChooser.refresh_desktop()
+            self.assertEqual(chooser.desktop, 'yad')
+
+        module.LinuxFileChooser.refresh_desktop()
+
+    @PlatformTest('linux')
+    def test_filechooser_portal_detection(self):
+        '''
+        Test the portal is picked only if its service is on the session bus.
+        '''
+        module = platform_import(platform='linux', module_name='filechooser')
+        dbus, listener, interface = mocked_dbus()
+        bus = dbus.SessionBus.return_value
+        bus.name_has_owner.return_value = False
+        bus.list_activatable_names.return_value = []
+
+        with patch.dict(sys.modules, {'dbus': dbus}), \
+                patch.object(module, 'module_available', return_value=True), \
+                patch.object(module, 'whereis_exe', return_value=None), \
+                patch.dict('os.environ', {}, clear=True):
+            module.LinuxFileChooser.refresh_desktop()
+            self.assertIsNone(module.instance().desktop)
+            bus.name_has_owner.assert_called_once_with(
+                'org.freedesktop.portal.Desktop'
+            )
+            bus.close.assert_called_once_with()
+
+            bus.list_activatable_names.return_value = [
+                'org.freedesktop.portal.Desktop'
+            ]
+            module.LinuxFileChooser.refresh_desktop()
+            self.assertEqual(module.instance().desktop, 'portal')
+
+            # no session bus
+            dbus.SessionBus.side_effect = dbus.exceptions.DBusException()
+            module.LinuxFileChooser.refresh_desktop()
+            self.assertIsNone(module.instance().desktop)
+
+        module.LinuxFileChooser.refresh_desktop()
+
+    @PlatformTest('linux')
+    def test_filechooser_portal_error(self):
+        '''
+        Test a failed portal call is reported as OSError.
+        '''
+        module = platform_import(platform='linux', module_name='filechooser')
+        dbus, listener, interface = mocked_dbus()
+        interface.OpenFile.side_effect = dbus.exceptions.DBusException(
+            'org.freedesktop.DBus.Error.ServiceUnknown'
+        )
+
+        with patch.dict(sys.modules, {'dbus': dbus}), \
+                patch.object(module.SignalListener, 'instance',
+                             return_value=listener), \
+                patch.object(module.PortalFileChooser, '_proxy', None):
+            chooser = module.PortalFileChooser(mode='open')
+            with self.assertRaises(OSError):
+                chooser.run()
+            # the response isn't waited for anymore
+            listener.connect.return_value.remove.assert_called_once_with()
+
+    @PlatformTest('linux')
+    def test_filechooser_portal(self):
+        '''
+        Test the portal back-end subscribes to the response of the request
+        before opening the dialog.
+        '''
+        module = platform_import(platform='linux', module_name='filechooser')
+        dbus, listener, interface = mocked_dbus()
+        handle = '/org/freedesktop/portal/desktop/request/1_42/plyer{}_1'
+
+        with patch.dict(sys.modules, {'dbus': dbus}), \
+                patch.object(module.SignalListener, 'instance',
+                             return_value=listener), \
+                patch.object(module.PortalFileChooser, '_proxy', None), \
+                patch.object(module.PortalFileChooser, '_tokens',
+                             iter([1, 2])):
+            handle = handle.format(os.getpid())
+            interface.OpenFile.return_value = handle
+            selected = []
+            future = module.PortalFileChooser(
+                mode='open', multiple=True, title='Pick',
+                filters=[['Images', '*.png', '*.jpg'], '*.txt'],
+                path='/tmp', on_selection=selected.append
+            ).run_async()
+
+            listener.connect.assert_called_once_with(
+                'org.freedesktop.portal.Request', 'Response', ANY,
+                path=handle
+            )
+            interface.OpenFile.assert_called_once_with('', 'Pick', {
+                'handle_token': 'plyer{}_1'.format(os.getpid()),
+                'multiple': True,
+                'directory': False,
+                'filters': [
+                    ('Images', [(0, '*.png'), (0, '*.jpg')]),
+                    ('*.txt', [(0, '*.txt')])
+                ],
+                'current_folder': b'/tmp\0'
+            })
+            self.assertFalse(future.done())
+
+            response = listener.connect.call_args[0][2]
+            response(0, {'uris': ['file:///tmp/a%20b', 'file:///tmp/c']})
+            self.assertEqual(future.result(timeout=1), ['/tmp/a b', '/tmp/c'])
+            self.assertEqual(selected, [['/tmp/a b', '/tmp/c']])
+            listener.connect.return_value.remove.assert_called_once_with()
+
+            # save dialog, cancelled by the application
+            interface.SaveFile.return_value = 'request'
+            future = module.PortalFileChooser(
+                mode='save', path='/tmp/new.txt'
+            ).run_async()
+            options = interface.SaveFile.call_args[0][2]
+            self.assertEqual(options['current_name'], 'new.txt')
+            self.assertNotIn('multiple', options)
+
+            self.assertTrue(future.cancel())
+            dbus.Interface.return_value.Close.assert_called_once_with()
+            # the old portal's request path is subscribed to too
+            self.assertEqual(listener.connect.call_args[1]['path'], 'request')
+
+
+if __name__ == '__main__':
+    unittest.main()
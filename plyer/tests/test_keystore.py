@@ -0,0 +1,35 @@
+'''
+TestKeystore
+============
+
+Tested platforms:
+
+* Linux
+'''
+
+import unittest
+
+from plyer.tests.common import PlatformTest, imported_modules
+
+
+class TestKeystore(unittest.TestCase):
+    '''
+    TestCase for plyer.keystore.
+    '''
+
+    @PlatformTest('linux')
+    def test_keystore_import_cost(self):
+        '''
+        Test keyring isn't imported before a key is accessed.
+        '''
+        modules = imported_modules(
+            'from plyer.platforms.linux import keystore\n'
+            'assert isinstance(keystore.instance(), keystore.LinuxKeystore)',
+            stubs=['keyring']
+        )
+        self.assertIn('plyer.platforms.linux.keystore', modules)
+        self.assertNotIn('keyring', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,11 +11,17 @@ Tested platforms:
 import unittest
 import sys
 
+from threading import Event
 from time import sleep
 from os.path import dirname, abspath, join
 from unittest.mock import Mock, patch
 
-from plyer.tests.common import PlatformTest, platform_import
+from plyer.tests.common import (
+    PlatformTest, platform_import, imported_modules, private_session_bus,
+    session_bus_missing
+)
+
+SESSION_BUS_MISSING = session_bus_missing()
 
 
 class MockedNotifySend:
@@ -48,6 +54,27 @@ class MockedNotifySend:
         assert 'dbus package is not installed' in msg
 
 
+class DBusException(Exception):
+    '''
+    Stand-in for dbus.exceptions.DBusException.
+    '''
+
+
+def mocked_dbus():
+    '''
+    Create a mocked dbus module, where SessionBus() and Interface()
+    return the same mocked connection and proxy for each call.
+    '''
+    interface = Mock()
+    session_bus = Mock()
+    dbus = Mock(
+        SessionBus=Mock(return_value=session_bus),
+        Interface=Mock(return_value=interface),
+        exceptions=Mock(DBusException=DBusException)
+    )
+    return dbus, session_bus, interface
+
+
 class TestNotification(unittest.TestCase):
     '''
     TestCase for plyer.notification.
@@ -180,12 +207,681 @@ class TestNotification(unittest.TestCase):
                 TestNotification.data['title'],
                 TestNotification.data['message'],
                 [], {},
-                TestNotification.data['timeout'] * 1000
+                TestNotification.data['timeout'] * 1000,
+                signature='susssasa{sv}i'
             )
         finally:
             del sys.modules['dbus']
         self.assertNotIn('dbus', sys.modules)
 
+    @PlatformTest('linux')
+    def test_notification_dbus_reuse(self):
+        '''
+        Test NotifyDbus connects once and reconnects on bus failure.
+        '''
+        notif = platform_import(
+            platform='linux',
+            module_name='notification'
+        ).NotifyDbus()
+        dbus, session_bus, interface = mocked_dbus()
+
+        with patch.dict(sys.modules, {'dbus': dbus}):
+            for _ in range(3):
+                self.show_notification(notif)
+            dbus.SessionBus.assert_called_once_with(private=True)
+            session_bus.get_object.assert_called_once()
+            self.assertEqual(interface.Notify.call_count, 3)
+
+            # server went away, reconnect and retry once
+            interface.Notify.side_effect = (DBusException(), 7)
+            self.show_notification(notif)
+            session_bus.close.assert_called_once_with()
+            self.assertEqual(dbus.SessionBus.call_count, 2)
+            self.assertEqual(interface.Notify.call_count, 5)
+
+            # reconnect doesn't help, the error is raised
+            interface.Notify.side_effect = DBusException()
+            self.assertRaises(
+                DBusException, self.show_notification, notif
+            )
+
+    def test_notification_update_coalesce(self):
+        '''
+        Test rapid updates of a notification are collapsed.
+        '''
+        from plyer.facades import Notification
+
+        sent = []
+        flushed = Event()
+
+        class RecordedNotification(Notification):
+            '''
+            Notification backend recording sent notifications.
+            '''
+            def _notify(self, **kwargs):
+                sent.append(kwargs)
+                if len(sent) == 4:
+                    flushed.set()
+                return kwargs.get('replaces_id') or 42
+
+        notif = RecordedNotification()
+        handle = notif.notify(title='progress', message='0')
+        self.assertEqual(handle, 42)
+
+        # without coalescing every update is sent
+        notif.update(handle, title='progress', message='1')
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(sent[1]['replaces_id'], 42)
+
+        notif.update_rate = 5
+        for percent in range(2, 50):
+            self.assertEqual(
+                notif.update(handle, title='progress', message=percent),
+                handle
+            )
+        self.assertEqual(len(sent), 3)
+
+        # the latest update is sent once the interval elapses
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(sent[-1]['message'], 49)
+        self.assertEqual(sent[-1]['replaces_id'], 42)
+
+    def test_notification_rate_limit(self):
+        '''
+        Test token bucket limit per app and title and deduplication.
+        '''
+        from plyer.facades import Notification
+
+        sent = []
+
+        class RecordedNotification(Notification):
+            '''
+            Notification backend recording sent notifications.
+            '''
+            def _notify(self, **kwargs):
+                sent.append(kwargs['message'])
+                return len(sent)
+
+        notif = RecordedNotification()
+        notif.rate_limit = 0.001
+        notif.rate_burst = 3
+        for idx in range(10):
+            notif.notify(app_name='app', title='alert', message=str(idx))
+        notif.notify(app_name='app', title='other', message='x')
+        self.assertEqual(sent, ['0', '1', '2', 'x'])
+        self.assertEqual(notif.suppressed, {('app', 'alert'): 7})
+
+        # refilled bucket
+        notif.rate_limit = 1000
+        sleep(0.01)
+        self.assertIsNotNone(notif.notify(
+            app_name='app', title='alert', message='refilled'
+        ))
+        # full idle buckets are evicted
+        self.assertEqual(list(notif._limits['buckets']), [('app', 'alert')])
+
+        sent.clear()
+        notif.rate_limit = 0
+        notif.dedup_window = 0.2
+        for _ in range(5):
+            notif.notify(app_name='app', title='same', message='message')
+        self.assertIsNone(
+            notif.notify(app_name='app', title='same', message='message')
+        )
+        notif.notify(app_name='app', title='same', message='another')
+        self.assertEqual(sent, ['message', 'another'])
+        self.assertEqual(notif.suppressed[('app', 'same')], 5)
+        self.assertEqual(list(notif._limits['recent']), [
+            ('app', 'same', 'message'), ('app', 'same', 'another')
+        ])
+
+        # shown again once the window elapses
+        sleep(0.25)
+        notif.notify(app_name='app', title='same', message='message')
+        self.assertEqual(sent, ['message', 'another', 'message'])
+
+    def test_notification_dispatcher(self):
+        '''
+        Test queued delivery with overflow policies and batching.
+        '''
+        from plyer.facades import Notification
+
+        sent = []
+        entered = Event()
+        release = Event()
+
+        class BlockedNotification(Notification):
+            '''
+            Notification backend blocked until released.
+            '''
+            def _notify(self, **kwargs):
+                entered.set()
+                release.wait(5)
+                sent.append(kwargs['message'])
+                return len(sent)
+
+        notif = BlockedNotification()
+        dispatcher = notif.start_dispatcher(maxsize=2)
+        try:
+            futures = [notif.notify(title='title', message='0')]
+            self.assertTrue(entered.wait(5))
+            futures += [
+                notif.notify(title='title', message=str(idx))
+                for idx in range(1, 5)
+            ]
+            release.set()
+            self.assertTrue(dispatcher.flush(5))
+        finally:
+            notif.stop_dispatcher()
+
+        # the first one was in flight, then only two fit in the queue
+        self.assertEqual(sent, ['0', '3', '4'])
+        self.assertEqual(dispatcher.dropped, 2)
+        self.assertTrue(futures[1].cancelled())
+        self.assertEqual(futures[4].result(), 3)
+
+        # merge overflowing messages and batch the queued ones
+        sent.clear()
+        entered.clear()
+        release.clear()
+        dispatcher = notif.start_dispatcher(
+            maxsize=2, overflow='merge', batch_size=2
+        )
+        try:
+            first = notif.notify(title='title', message='a')
+            self.assertTrue(entered.wait(5))
+            notif.notify(title='other', message='b')
+            merged = [
+                notif.notify(title='title', message=message)
+                for message in 'cde'
+            ]
+            release.set()
+            self.assertEqual(first.result(5), 1)
+        finally:
+            notif.stop_dispatcher()
+
+        self.assertEqual(sent, ['a', 'b', 'c\nd\ne'])
+        self.assertEqual(dispatcher.dropped, 0)
+        self.assertEqual([future.result() for future in merged], [3, 3, 3])
+
+        # block when full, deliver batches of the same app and title
+        sent.clear()
+        entered.clear()
+        release.clear()
+        notif.start_dispatcher(maxsize=10, overflow='block', batch_size=2)
+        try:
+            notif.notify(title='title', message='a')
+            self.assertTrue(entered.wait(5))
+            for message in 'xyz':
+                notif.notify(title='title', message=message)
+            release.set()
+        finally:
+            notif.stop_dispatcher()
+
+        self.assertEqual(sent, ['a', 'x\ny', 'z'])
+        self.assertIsNone(notif._dispatcher)
+        self.assertEqual(notif.notify(message='sync'), 4)
+
+    def test_notification_dispatcher_callbacks(self):
+        '''
+        Test notifications with other actions, callbacks or hints
+        aren't merged.
+        '''
+        from plyer.facades import Notification
+
+        sent = []
+        entered = Event()
+        release = Event()
+
+        class BlockedNotification(Notification):
+            '''
+            Notification backend blocked until released.
+            '''
+            def _notify(self, **kwargs):
+                entered.set()
+                release.wait(5)
+                sent.append(kwargs)
+                return len(sent)
+
+        def on_action(handle, key):
+            pass
+
+        notif = BlockedNotification()
+        notif.start_dispatcher(maxsize=2, overflow='merge', batch_size=5)
+        try:
+            notif.notify(title='title', message='a')
+            self.assertTrue(entered.wait(5))
+            futures = [
+                notif.notify(title='title', message='b'),
+                notif.notify(
+                    title='title', message='c', actions=[('yes', 'Yes')],
+                    on_action=on_action
+                ),
+                notif.notify(
+                    title='title', message='d', hints={'urgency': 2}
+                ),
+                notif.notify(
+                    title='title', message='e', actions=[('yes', 'Yes')],
+                    on_action=on_action
+                )
+            ]
+            release.set()
+            self.assertTrue(notif._dispatcher.flush(5))
+        finally:
+            notif.stop_dispatcher()
+
+        # the queue was full, only identical ones were merged
+        self.assertEqual(
+            [kwargs['message'] for kwargs in sent], ['a', 'c\ne', 'd']
+        )
+        self.assertEqual(sent[1]['on_action'], on_action)
+        self.assertEqual(sent[2]['hints'], {'urgency': 2})
+        self.assertTrue(futures[0].cancelled())
+        self.assertEqual(
+            [future.result() for future in futures[1:]], [2, 3, 2]
+        )
+
+    @PlatformTest('linux')
+    def test_notification_dbus_handle(self):
+        '''
+        Test NotifyDbus returns the notification ID and replaces it.
+        '''
+        notif = platform_import(
+            platform='linux',
+            module_name='notification'
+        ).NotifyDbus()
+        dbus, _, interface = mocked_dbus()
+        interface.Notify.return_value = 7
+
+        with patch.dict(sys.modules, {'dbus': dbus}):
+            handle = notif.notify(title='title', message='message')
+            self.assertEqual(handle, 7)
+            notif.update(handle, title='title', message='updated')
+
+        self.assertEqual(interface.Notify.call_args_list[0][0][1], 0)
+        self.assertEqual(interface.Notify.call_args_list[1][0][1], 7)
+        self.assertEqual(interface.Notify.call_args_list[1][0][4], 'updated')
+
+    @PlatformTest('linux')
+    def test_notification_dbus_types(self):
+        '''
+        Test NotifyDbus arguments match the Notify signature
+        of the notification server.
+        '''
+        notif = platform_import(
+            platform='linux',
+            module_name='notification'
+        ).NotifyDbus()
+        dbus, _, interface = mocked_dbus()
+        interface.Notify.return_value = 7
+
+        with patch.dict(sys.modules, {'dbus': dbus}):
+            handle = notif.notify(
+                title='title', message='message',
+                actions=[('yes', 'Yes')]
+            )
+            notif.update(
+                handle, title='title', message='message', timeout=0.5,
+                hints={'urgency': 2}
+            )
+            notif.close(handle)
+
+        checks = {
+            's': lambda value: isinstance(value, str),
+            'u': lambda value: isinstance(value, int) and value >= 0,
+            'i': lambda value: isinstance(value, int),
+            'as': lambda value: all(isinstance(val, str) for val in value),
+            'a{sv}': lambda value: all(isinstance(key, str) for key in value)
+        }
+        for args, kwargs in interface.Notify.call_args_list:
+            self.assertEqual(kwargs, {'signature': 'susssasa{sv}i'})
+            types = ('s', 'u', 's', 's', 's', 'as', 'a{sv}', 'i')
+            self.assertEqual(len(args), len(types))
+            for value, kind in zip(args, types):
+                self.assertTrue(checks[kind](value), (kind, value))
+
+        self.assertEqual(interface.Notify.call_args_list[1][0][1], 7)
+        self.assertEqual(interface.Notify.call_args_list[1][0][7], 500)
+        interface.CloseNotification.assert_called_once_with(
+            7, signature='u'
+        )
+
+    @PlatformTest('linux')
+    def test_notification_portal(self):
+        '''
+        Test xdg-desktop-portal notifications over D-Bus.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='notification'
+        )
+        dbus, session_bus, interface = mocked_dbus()
+        dbus.String = lambda value, variant_level: (value, variant_level)
+        dbus.Dictionary = lambda value, signature: (value, signature)
+
+        with patch.dict(sys.modules, {'dbus': dbus}):
+            notif = module.NotifyDesktopPortals()
+            first = notif.notify(title="it's", message='a "message"')
+            second = notif.notify(title='title', message='message')
+            self.assertNotEqual(first, second)
+            self.assertEqual(notif.update(first, title='new'), first)
+            notif.close(second)
+
+        dbus.SessionBus.assert_called_once_with(private=True)
+        session_bus.get_object.assert_called_once_with(
+            'org.freedesktop.portal.Desktop',
+            '/org/freedesktop/portal/desktop'
+        )
+        dbus.Interface.assert_called_once_with(
+            session_bus.get_object(), 'org.freedesktop.portal.Notification'
+        )
+        calls = interface.AddNotification.call_args_list
+        self.assertEqual(calls[0][0], (first, ({
+            'title': ("it's", 1), 'body': ('a "message"', 1)
+        }, 'sv')))
+        self.assertEqual(calls[2][0][0], first)
+        interface.RemoveNotification.assert_called_once_with(second)
+
+    @PlatformTest('linux')
+    def test_notification_portal_gdbus(self):
+        '''
+        Test xdg-desktop-portal notifications with gdbus.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='notification'
+        )
+        with patch.object(module, 'module_available', return_value=False):
+            notif = module.NotifyDesktopPortals()
+
+        with patch('subprocess.run') as run:
+            handle = notif.notify(title="it's", message='back\\slash\n')
+            notif.close(handle)
+
+        args = run.call_args_list[0][0][0]
+        self.assertEqual(args[0], 'gdbus')
+        self.assertEqual(args[-2:], [
+            "'{}'".format(handle),
+            "{'title': <'it\\'s'>, 'body': <'back\\\\slash\\n'>}"
+        ])
+        self.assertEqual(
+            run.call_args_list[1][0][0][-1], "'{}'".format(handle)
+        )
+
+    @unittest.skipIf(SESSION_BUS_MISSING, SESSION_BUS_MISSING)
+    @PlatformTest('linux')
+    def test_notification_portal_session_bus(self):
+        '''
+        Test xdg-desktop-portal notifications against a fake portal
+        on a private session bus, with dbus-python and with gdbus.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='notification'
+        )
+        clicked = Event()
+        invoked = []
+
+        def on_action(handle, key):
+            invoked.append((handle, key))
+            clicked.set()
+
+        with private_session_bus('portal') as services, \
+                patch.object(module.SignalListener, '_instance', None):
+            portal = services['portal']
+            notif = module.NotifyDesktopPortals()
+            try:
+                plain = notif.notify(title="it's", message='a "message"')
+                self.assertEqual(portal.next_call(), [
+                    'AddNotification', 'sa{sv}', plain,
+                    {'title': "it's", 'body': 'a "message"'}
+                ])
+
+                # the portal signals only the connection which added
+                # the notification
+                handle = notif.notify(
+                    title='buttons', message='message',
+                    actions=[('yes', 'Yes')], on_action=on_action
+                )
+                self.assertEqual(portal.next_call()[3]['buttons'], [
+                    {'label': 'Yes', 'action': 'yes'}
+                ])
+                self.assertTrue(clicked.wait(5))
+                self.assertEqual(invoked, [(handle, 'yes')])
+
+                notif.close(plain)
+                self.assertEqual(
+                    portal.next_call(), ['RemoveNotification', 's', plain]
+                )
+
+                # gdbus can't receive the signals, actions are dropped
+                with patch.object(
+                        module, 'module_available', return_value=False):
+                    fallback = module.NotifyDesktopPortals()
+                with self.assertWarns(UserWarning):
+                    handle = fallback.notify(
+                        title='back\\slash', message='new\nline',
+                        actions=[('yes', 'Yes')], on_action=on_action
+                    )
+                self.assertEqual(portal.next_call(), [
+                    'AddNotification', 'sa{sv}', handle,
+                    {'title': 'back\\slash', 'body': 'new\nline'}
+                ])
+            finally:
+                notif._proxy.reset()
+                if module.SignalListener._instance is not None:
+                    module.SignalListener._instance.stop()
+
+    @PlatformTest('linux')
+    def test_notification_portal_callbacks(self):
+        '''
+        Test portal notifications with callbacks are added over
+        the connection the portal sends ActionInvoked to.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='notification'
+        )
+        dbus, private_bus, _ = mocked_dbus()
+        dbus.Interface = Mock(side_effect=lambda obj, name: obj.interface)
+        dbus.Dictionary = lambda value, signature: dict(value)
+        listener = Mock()
+        receivers = {private_bus: [], listener.bus: []}
+        listener.connect.side_effect = (
+            lambda interface, signal, callback:
+            receivers[listener.bus].append(callback)
+        )
+        invoked = []
+
+        def on_action(handle, key):
+            invoked.append((handle, key))
+
+        with patch.dict(sys.modules, {'dbus': dbus}), patch.object(
+                module.SignalListener, 'instance', return_value=listener):
+            notif = module.NotifyDesktopPortals()
+            plain = notif.notify(title='plain')
+            clicked = notif.notify(
+                title='buttons', actions=[('yes', 'Yes')],
+                on_action=on_action
+            )
+            notif.close(plain)
+
+        # the portal signals only the connection which added
+        # the notification
+        for bus in (private_bus, listener.bus):
+            calls = bus.get_object().interface.AddNotification.call_args_list
+            for call in calls:
+                for callback in receivers[bus]:
+                    callback(call[0][0], 'yes', [])
+
+        self.assertEqual(invoked, [(clicked, 'yes')])
+        private_bus.close.assert_called_once_with()
+        listener.bus.close.assert_not_called()
+        listener.bus.get_object().interface.RemoveNotification \
+            .assert_called_once_with(plain)
+
+    @PlatformTest('linux')
+    def test_notification_dbus_callbacks(self):
+        '''
+        Test action and close signals are routed by notification handle.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='notification'
+        )
+        dbus, _, interface = mocked_dbus()
+        interface.Notify.side_effect = (7, 8, 9)
+        listener = Mock()
+        invoked = []
+
+        def on_action(handle, key):
+            invoked.append(('action', handle, key))
+
+        def on_close(handle, reason):
+            invoked.append(('close', handle, reason))
+
+        with patch.dict(sys.modules, {'dbus': dbus}), patch.object(
+                module.SignalListener, 'instance', return_value=listener):
+            notif = module.NotifyDbus()
+            notif.notify(
+                title='first', actions=[('yes', 'Yes'), ('no', 'No')],
+                on_action=on_action, on_close=on_close
+            )
+            notif.notify(title='second', on_close=on_close)
+            notif.notify(title='no callbacks')
+
+        self.assertEqual(
+            interface.Notify.call_args_list[0][0][5],
+            ['yes', 'Yes', 'no', 'No']
+        )
+
+        # sent over the connection receiving the signals
+        dbus.SessionBus.assert_not_called()
+        listener.bus.get_object.assert_called_once_with(
+            'org.freedesktop.Notifications', '/org/freedesktop/Notifications'
+        )
+
+        # subscribed once for all the notifications
+        self.assertEqual(listener.connect.call_count, 2)
+        signals = {
+            call[0][1]: call[0][2] for call in listener.connect.call_args_list
+        }
+        signals['ActionInvoked'](7, 'yes')
+        signals['ActionInvoked'](8, 'yes')
+        signals['ActionInvoked'](42, 'yes')
+        signals['NotificationClosed'](7, 2)
+        signals['NotificationClosed'](7, 2)
+        signals['NotificationClosed'](9, 1)
+        signals['NotificationClosed'](8, 3)
+        self.assertEqual(invoked, [
+            ('action', 7, 'yes'), ('close', 7, 2), ('close', 8, 3)
+        ])
+
+    @unittest.skipIf(SESSION_BUS_MISSING, SESSION_BUS_MISSING)
+    @PlatformTest('linux')
+    def test_notification_dbus_session_bus(self):
+        '''
+        Test NotifyDbus against a fake notification server on a private
+        session bus, which signals only the connection calling Notify.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='notification'
+        )
+        done = Event()
+        invoked = []
+
+        def on_action(handle, key):
+            invoked.append(('action', handle, key))
+
+        def on_close(handle, reason):
+            invoked.append(('close', handle, reason))
+            done.set()
+
+        with private_session_bus('notifications') as services, \
+                patch.object(module.SignalListener, '_instance', None):
+            server = services['notifications']
+            notif = module.NotifyDbus()
+            try:
+                self.assertEqual(notif.notify(title='plain'), 1)
+                self.assertEqual(server.next_call(), [
+                    'Notify', 'susssasa{sv}i', '', 0, '', 'plain', '',
+                    [], {}, 10000
+                ])
+
+                # the action is invoked before Notify returns
+                handle = notif.notify(
+                    title='title', message='message', timeout=0.5,
+                    actions=[('yes', 'Yes')], hints={'urgency': 2},
+                    on_action=on_action, on_close=on_close
+                )
+                self.assertEqual(server.next_call()[1:], [
+                    'susssasa{sv}i', '', 0, '', 'title', 'message',
+                    ['yes', 'Yes'], {'urgency': 2}, 500
+                ])
+                notif.close(handle)
+                self.assertEqual(
+                    server.next_call(), ['CloseNotification', 'u', handle]
+                )
+                self.assertTrue(done.wait(5))
+                self.assertEqual(invoked, [
+                    ('action', handle, 'yes'), ('close', handle, 3)
+                ])
+            finally:
+                listener = module.SignalListener._instance
+                if listener is not None:
+                    listener.stop()
+
+        # a stopped listener isn't reused
+        self.assertIsNone(module.SignalListener._instance)
+
+    @PlatformTest('linux')
+    def test_notification_signal_listener(self):
+        '''
+        Test the shared signal listener runs a single GLib main loop.
+        '''
+        from plyer.platforms.linux.libs.session_bus import SignalListener
+
+        dbus, session_bus, _ = mocked_dbus()
+        glib = Mock()
+        modules = {
+            'dbus': dbus, 'dbus.mainloop': Mock(),
+            'dbus.mainloop.glib': Mock(), 'gi': Mock(),
+            'gi.repository': Mock(GLib=glib)
+        }
+
+        with patch.dict(sys.modules, modules), \
+                patch.object(SignalListener, '_instance', None):
+            listener = SignalListener.instance()
+            self.assertIs(SignalListener.instance(), listener)
+            callback = Mock()
+            listener.connect('org.example', 'Changed', callback)
+            listener.stop()
+            self.assertIsNone(SignalListener._instance)
+
+        modules['dbus.mainloop.glib'].threads_init.assert_called_once_with()
+        glib.MainLoop.assert_called_once_with()
+        glib.MainLoop().run.assert_called_once_with()
+        session_bus.add_signal_receiver.assert_called_once_with(
+            callback, signal_name='Changed', dbus_interface='org.example',
+            path=None
+        )
+        session_bus.close.assert_called_once_with()
+
+    @PlatformTest('linux')
+    def test_notification_import_cost(self):
+        '''
+        Test dbus isn't imported before the first notification.
+        '''
+        modules = imported_modules(
+            'from plyer.platforms.linux import notification\n'
+            'notification.instance()',
+            stubs=['dbus']
+        )
+        self.assertIn('plyer.platforms.linux.notification', modules)
+        self.assertNotIn('dbus', modules)
+
     @PlatformTest('linux')
     def test_notification_notifysend(self):
         '''
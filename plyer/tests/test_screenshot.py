@@ -8,13 +8,79 @@ Tested platforms:
 * Linux
 '''
 
+import ctypes
+import struct
 import unittest
+import zlib
 
-from os import mkdir, remove
+from os import environ, mkdir, remove
 from os.path import join, expanduser, exists
-from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import sleep
+from unittest.mock import Mock, patch
 
 from plyer.tests.common import PlatformTest, platform_import
+from plyer.utils import module_available
+
+# RGB of the pixels of a 3x2 image
+RGB = [
+    [(255, 0, 0), (0, 255, 0), (0, 0, 255)],
+    [(1, 2, 3), (250, 128, 7), (255, 255, 255)]
+]
+
+
+def xwd_dump(rgb, bits_per_pixel=32, byte_order=0,
+             masks=(0xFF0000, 0xFF00, 0xFF), name=b'root'):
+    '''
+    Create an XWD dump of RGB pixels packed with masks,
+    rows padded to 4 bytes.
+    '''
+    height, width = len(rgb), len(rgb[0])
+    size = bits_per_pixel // 8
+    bytes_per_line = (width * size + 3) // 4 * 4
+    header_size = 100 + len(name) + 1
+    header = struct.pack(
+        '>25I', header_size, 7, 2, 24, width, height, 0, byte_order,
+        32, byte_order, 32, bits_per_pixel, bytes_per_line, 4,
+        masks[0], masks[1], masks[2], 8, 256, 0, width, height, 0, 0, 0
+    )
+
+    data = bytearray()
+    for row in rgb:
+        line = bytearray()
+        for pixel in row:
+            value = 0
+            for channel, mask in zip(pixel, masks):
+                shift = (mask & -mask).bit_length() - 1
+                value |= channel * (mask >> shift) // 255 << shift
+            order = 'little' if byte_order == 0 else 'big'
+            line += value.to_bytes(size, order)
+        data += line.ljust(bytes_per_line, b'\xAA')
+    return header + name + b'\0' + bytes(data)
+
+
+def png_rows(png):
+    '''
+    Return the rows of an RGB PNG as lists of pixels.
+    '''
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    offset, chunks = 8, {}
+    while offset < len(png):
+        length, = struct.unpack_from('>I', png, offset)
+        kind = png[offset + 4:offset + 8]
+        chunks[kind] = png[offset + 8:offset + 8 + length]
+        offset += length + 12
+    width, height = struct.unpack_from('>2I', chunks[b'IHDR'])
+    data = zlib.decompress(chunks[b'IDAT'])
+    stride = width * 3 + 1
+    return [
+        [
+            tuple(data[row * stride + 1 + col * 3:][:3])
+            for col in range(width)
+        ]
+        for row in range(height)
+    ]
 
 
 class MockedScreenCapture:
@@ -132,6 +198,374 @@ class TestScreenshot(unittest.TestCase):
         self.assertTrue(exists(scr.file_path))
         remove(scr.file_path)
 
+    @PlatformTest('linux')
+    def test_screenshot_xwd_buffer(self):
+        '''
+        Test the screenshot is read from the xwd pipe and the default
+        path is looked up only when it's needed.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='screenshot',
+            whereis_exe=MockedXWD.whereis_exe
+        )
+        dump = xwd_dump(RGB)
+
+        with patch.object(module, 'LinuxStoragePath') as storage, \
+                patch(target='subprocess.run',
+                      return_value=Mock(stdout=dump)) as run:
+            storage().get_pictures_dir.return_value = '/tmp'
+            storage.reset_mock()
+            scr = module.instance()
+            self.assertIs(scr.capture_to_buffer(), dump)
+            storage.assert_not_called()
+            self.assertEqual(scr.file_path, join('/tmp', 'screenshot.xwd'))
+
+        self.assertEqual(
+            run.call_args[0][0], ['xwd', '-silent', '-root']
+        )
+        self.assertTrue(run.call_args[1]['check'])
+
+    @PlatformTest('linux')
+    def test_screenshot_xwd_stream(self):
+        '''
+        Test unchanged frames of a region are skipped.
+        '''
+        from plyer.platforms.linux.libs.xwd import XWDImage
+
+        module = platform_import(
+            platform='linux',
+            module_name='screenshot',
+            whereis_exe=MockedXWD.whereis_exe
+        )
+        screen = [[(row, col, 0) for col in range(4)] for row in range(40)]
+        outside = [list(row) for row in screen]
+        outside[0][0] = (255, 255, 255)
+        inside = [list(row) for row in outside]
+        inside[30][2] = (255, 255, 255)
+        images = [
+            XWDImage(xwd_dump(rgb))
+            for rgb in (screen, screen, outside, inside)
+        ]
+
+        def capture():
+            if len(images) == 1:
+                stream.close()
+            return images.pop(0)
+
+        stream = module.CaptureStream(capture, fps=1000, region=(1, 2, 8, 37))
+        frames = list(stream)
+
+        self.assertEqual([frame.index for frame in frames], [0, 1])
+        self.assertEqual((stream.captured, stream.skipped), (4, 2))
+        self.assertGreater(stream.frame_rate, 0)
+        # clipped to the screen, the change is in the 2nd band of rows
+        self.assertEqual(frames[0].region, (1, 2, 3, 37))
+        self.assertEqual(frames[0].changed, [0, 1, 2])
+        self.assertEqual(frames[1].changed, [1])
+
+        rows = list(frames[1].rows())
+        self.assertEqual(len(rows), 37)
+        # BGRX pixels of the columns 1-3 of the row 30
+        self.assertEqual(bytes(rows[28]), bytes([
+            0, 1, 30, 0, 255, 255, 255, 0, 0, 3, 30, 0
+        ]))
+
+    @PlatformTest('linux')
+    def test_screenshot_png_pipeline(self):
+        '''
+        Test frames are encoded in parallel, yielded in order
+        and dropped when too many are pending.
+        '''
+        from plyer.platforms.linux.libs.xwd import XWDImage
+
+        module = platform_import(
+            platform='linux',
+            module_name='screenshot',
+            whereis_exe=MockedXWD.whereis_exe
+        )
+        image = XWDImage(xwd_dump(RGB))
+        frames = [
+            module.ScreenFrame(index / 10, index, (1, 0, 2, 2), image, [0])
+            for index in range(20)
+        ]
+
+        pipeline = module.EncodingPipeline(
+            iter(frames), workers=4, block=True
+        )
+        encoded = list(pipeline)
+        self.assertEqual([frame.index for frame in encoded], list(range(20)))
+        self.assertEqual((pipeline.encoded, pipeline.dropped), (20, 0))
+        self.assertEqual(encoded[0].region, (1, 0, 2, 2))
+        self.assertEqual(
+            png_rows(encoded[-1].data), [row[1:] for row in RGB]
+        )
+
+        release = Event()
+
+        def stream():
+            yield from frames[:5]
+            release.set()
+
+        def encode(frame, image):
+            release.wait(10)
+            return frame.index
+
+        pipeline = module.EncodingPipeline(stream(), max_pending=2)
+        pipeline._encode = encode
+        self.assertEqual(list(pipeline), [0, 1])
+        self.assertEqual((pipeline.encoded, pipeline.dropped), (2, 3))
+
+        # frames finishing out of order are reordered
+        pipeline = module.EncodingPipeline(iter(frames), workers=4, block=True)
+        pipeline._encode = lambda frame, image: (
+            sleep(0.001 * (frame.index % 3)) or frame.index
+        )
+        self.assertEqual(list(pipeline), list(range(20)))
+
+    @PlatformTest('linux')
+    def test_screenshot_xwd_stream_monitor(self):
+        '''
+        Test the stream region of a monitor from xrandr.
+        '''
+        module = platform_import(
+            platform='linux',
+            module_name='screenshot',
+            whereis_exe=MockedXWD.whereis_exe
+        )
+        output = (
+            'Monitors: 2\n'
+            ' 0: +*eDP-1 1920/344x1080/194+0+0  eDP-1\n'
+            ' 1: +HDMI-1 2560/597x1440/336+1920+0  HDMI-1\n'
+        )
+        with patch(target='subprocess.run',
+                   return_value=Mock(stdout=output)):
+            scr = module.instance()
+            self.assertEqual(scr.capture_stream(monitor=1).region, (
+                1920, 0, 2560, 1440
+            ))
+            stream = scr.capture_stream(
+                fps=5, monitor='eDP-1', region=(1800, 100, 400, 50)
+            )
+            self.assertEqual(stream.region, (1800, 100, 120, 50))
+            self.assertEqual(stream.fps, 5)
+            with self.assertRaises(ValueError):
+                scr.capture_stream(monitor=2)
+
+            pipeline = scr.capture_png_stream(monitor=1, block=True)
+            self.assertTrue(pipeline.block)
+            self.assertEqual(pipeline.stream.region, (1920, 0, 2560, 1440))
+            pipeline.close()
+
+    @PlatformTest('linux')
+    def test_screenshot_xwd_decode(self):
+        '''
+        Test decoding of XWD dumps of various visuals to PNG.
+        '''
+        from plyer.platforms.linux.libs.xwd import XWDImage
+
+        image = XWDImage(xwd_dump(RGB))
+        self.assertEqual((image.width, image.height), (3, 2))
+        self.assertEqual(image.window_name, 'root')
+        self.assertEqual(image.channel_offsets(), [2, 1, 0])
+        self.assertEqual(png_rows(image.to_png()), RGB)
+
+        image = XWDImage(xwd_dump(RGB, byte_order=1))
+        self.assertEqual(image.channel_offsets(), [1, 2, 3])
+        self.assertEqual(png_rows(image.to_png()), RGB)
+
+        image = XWDImage(xwd_dump(RGB, bits_per_pixel=24))
+        self.assertEqual(png_rows(image.to_png()), RGB)
+
+        with self.assertRaises(ValueError):
+            XWDImage(xwd_dump(RGB)[:-1])
+
+    @PlatformTest('linux')
+    def test_screenshot_xwd_convert(self):
+        '''
+        Test rows of visuals with channels which aren't whole bytes
+        are converted with and without NumPy.
+        '''
+        from plyer.platforms.linux.libs import xwd
+
+        rgb = [[(255, 0, 0), (0, 255, 255)], [(0, 0, 0), (255, 255, 255)]]
+        images = [
+            # RGB565
+            (xwd.XWDImage(xwd_dump(
+                rgb, bits_per_pixel=16, masks=(0xF800, 0x7E0, 0x1F)
+            )), rgb),
+            (xwd.XWDImage(xwd_dump(
+                rgb, bits_per_pixel=16, byte_order=1,
+                masks=(0xF800, 0x7E0, 0x1F)
+            )), rgb),
+            # 30-bit depth
+            (xwd.XWDImage(xwd_dump(
+                RGB, masks=(0x3FF00000, 0xFFC00, 0x3FF)
+            )), RGB),
+        ]
+
+        # colormap visuals
+        colors = [(0, 0, 0, 0), (7, 0xFFFF, 0x8000, 0x0100)]
+        header = xwd.XWDImage(xwd_dump(rgb)).header._replace(
+            visual_class=3, red_mask=0, green_mask=0, blue_mask=0
+        )
+        black, color = (0, 0, 0), (255, 128, 1)
+        expected = [[color, black], [black, color]]
+        images.append((xwd.XWDImage.from_pixels(header._replace(
+            bits_per_pixel=8, bytes_per_line=4
+        ), b'\7\0\0\0\0\7\0\0', colors=colors), expected))
+        images.append((xwd.XWDImage.from_pixels(header._replace(
+            bits_per_pixel=16, bytes_per_line=4, byte_order=1
+        ), b'\0\7\0\x09\0\0\0\7', colors=colors), [
+            [color, black], [black, color]
+        ]))
+
+        for numpy in {False, module_available('numpy')}:
+            with patch.object(xwd, 'module_available', return_value=numpy):
+                for image, pixels in images:
+                    self.assertIsNone(image.channel_offsets())
+                    self.assertEqual(png_rows(image.to_png()), pixels)
+
+    @PlatformTest('linux')
+    def test_screenshot_xwd_dump(self):
+        '''
+        Test an image over raw pixels is dumped as XWD.
+        '''
+        from plyer.platforms.linux.libs.xwd import XWDImage
+
+        dump = xwd_dump(RGB)
+        image = XWDImage(dump)
+        raw = XWDImage.from_pixels(image.header, bytes(image.pixels), 'root')
+        self.assertEqual(raw.dump(), dump)
+        self.assertEqual(png_rows(XWDImage(raw.dump()).to_png()), RGB)
+
+    @PlatformTest('linux')
+    def test_screenshot_xshm_fallback(self):
+        '''
+        Test xwd is used when there's no shared memory capture.
+        '''
+        from plyer.platforms.linux.libs import xshm
+
+        if xshm.available():
+            with self.assertRaises(OSError):
+                xshm.XShmCapture(':65000')
+
+        module = platform_import(
+            platform='linux',
+            module_name='screenshot',
+            whereis_exe=MockedXWD.whereis_exe
+        )
+        with patch.object(module.xshm, 'available', return_value=True), \
+                patch.object(module.xshm, 'XShmCapture',
+                             side_effect=OSError), \
+                patch(target='subprocess.run',
+                      return_value=Mock(stdout=xwd_dump(RGB))) as run:
+            image = module.instance().capture_image()
+        run.assert_called_once()
+        self.assertEqual(png_rows(image.to_png()), RGB)
+
+        # neither shared memory nor xwd
+        with patch.object(module.xshm, 'available', return_value=True), \
+                patch.object(module.xshm, 'XShmCapture',
+                             side_effect=OSError('no MIT-SHM')), \
+                patch.object(module, 'whereis_exe', return_value=None), \
+                patch(target='subprocess.run') as run:
+            with self.assertRaisesRegex(OSError, 'xwd is not installed'):
+                module.instance().capture_image()
+        run.assert_not_called()
+
+    @PlatformTest('linux')
+    def test_screenshot_xshm_libraries(self):
+        '''
+        Test the libraries for the shared memory capture are looked up once.
+        '''
+        from plyer.platforms.linux.libs import xshm
+
+        xshm.library_names.cache_clear()
+        try:
+            with patch.object(xshm, 'find_library',
+                              side_effect=lambda name: 'lib' + name) as find, \
+                    patch.dict('os.environ', {'DISPLAY': ':0'}):
+                self.assertTrue(xshm.available())
+                self.assertTrue(xshm.available())
+            self.assertEqual(find.call_count, 3)
+        finally:
+            xshm.library_names.cache_clear()
+
+    @PlatformTest('linux')
+    @unittest.skipUnless(environ.get('DISPLAY'), 'requires an X display')
+    def test_screenshot_xshm(self):
+        '''
+        Test capturing the root window to shared memory, e.g. under Xvfb.
+        '''
+        from plyer.platforms.linux.libs import xshm
+        from plyer.platforms.linux.libs.xwd import XWDImage
+
+        try:
+            capture = xshm.XShmCapture()
+        except OSError as exc:
+            self.skipTest(str(exc))
+
+        with capture:
+            first = capture.capture()
+            self.assertEqual(
+                (first.width, first.height), (capture.width, capture.height)
+            )
+            second = capture.capture()
+            # the segment is reused
+            self.assertEqual(
+                ctypes.addressof(ctypes.c_char.from_buffer(first.pixels)),
+                ctypes.addressof(ctypes.c_char.from_buffer(second.pixels))
+            )
+            image = XWDImage(second.dump())
+            self.assertEqual(next(image.iter_rows()), next(second.iter_rows()))
+
+    @PlatformTest('linux')
+    @unittest.skipUnless(module_available('numpy'), 'requires NumPy')
+    def test_screenshot_xwd_array(self):
+        '''
+        Test XWD dumps are returned as NumPy arrays over the dump.
+        '''
+        import numpy as np
+        from plyer.platforms.linux.libs.xwd import XWDImage
+
+        for byte_order in (0, 1):
+            image = XWDImage(xwd_dump(RGB, byte_order=byte_order))
+            rgb = image.to_array()
+            self.assertTrue(np.shares_memory(rgb, image.pixels))
+            self.assertEqual(rgb.tolist(), [list(map(list, r)) for r in RGB])
+
+        rgba = XWDImage(xwd_dump(RGB, bits_per_pixel=24)).to_array(True)
+        self.assertEqual(rgba.shape, (2, 3, 4))
+        self.assertEqual(rgba[1, 1].tolist(), [250, 128, 7, 255])
+
+        rgb = [[(255, 0, 0), (0, 255, 255)], [(0, 0, 0), (255, 255, 255)]]
+        image = XWDImage(xwd_dump(
+            rgb, bits_per_pixel=16, masks=(0xF800, 0x7E0, 0x1F)
+        ))
+        self.assertEqual(
+            image.to_array().tolist(), [list(map(list, r)) for r in rgb]
+        )
+
+    @PlatformTest('linux')
+    def test_screenshot_xwd_save_png(self):
+        '''
+        Test the last screenshot is converted to PNG.
+        '''
+        scr = platform_import(
+            platform='linux',
+            module_name='screenshot',
+            whereis_exe=MockedXWD.whereis_exe
+        ).instance()
+
+        with TemporaryDirectory() as temp:
+            scr.file_path = join(temp, 'screenshot.xwd')
+            with open(scr.file_path, 'wb') as fle:
+                fle.write(xwd_dump(RGB))
+            scr.save_png(join(temp, 'screenshot.png'))
+            with open(join(temp, 'screenshot.png'), 'rb') as fle:
+                self.assertEqual(png_rows(fle.read()), RGB)
+
 
 if __name__ == '__main__':
     unittest.main()
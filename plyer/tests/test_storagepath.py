@@ -5,12 +5,57 @@ TestStoragePath
 Tested platforms:
 
 * macOS
+* Linux
 '''
 
+import select
 import unittest
+from os import (
+    environ, link, makedirs, mkdir, scandir, symlink, utime
+)
+from os.path import join
+from shutil import rmtree
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
 
 from plyer.tests.common import platform_import, PlatformTest
 
+USER_DIRS = r'''
+# This file is written by xdg-user-dirs-update
+XDG_DESKTOP_DIR="$HOME"
+XDG_DOCUMENTS_DIR="$HOME/My \"Documents\""
+XDG_DOWNLOAD_DIR="/data/Down\\loads"
+XDG_MUSIC_DIR="relative/Music"
+XDG_PICTURES_DIR="$HOME/\$Pictures"
+  XDG_VIDEOS_DIR = "$HOME/Videos and films"
+XDG_PROJECTS_DIR="$HOME/Projects"
+'''
+
+MOUNTINFO = '''\
+23 28 0:22 / /proc rw,relatime - proc proc rw
+28 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw
+90 28 8:17 / /media/user/My\\040Disk rw,nosuid shared:50 - vfat /dev/sdb1 rw
+91 28 179:1 / /media/user/card ro,nosuid master:2 shared:51 - exfat \
+/dev/mmcblk0p1 ro
+92 28 7:0 / /snap/core/1 ro - squashfs /dev/loop0 ro
+'''
+
+
+def make_block_device(sys_path, number, device, removable, partition=True):
+    '''
+    Create a fake sysfs entry of a block device.
+    '''
+    disk = join(sys_path, 'devices', device)
+    path = join(disk, 'part') if partition else disk
+    makedirs(path)
+    if partition:
+        with open(join(path, 'partition'), 'w') as fle:
+            fle.write('1')
+    with open(join(disk, 'removable'), 'w') as fle:
+        fle.write(removable)
+    makedirs(join(sys_path, 'dev', 'block'), exist_ok=True)
+    symlink(path, join(sys_path, 'dev', 'block', number))
+
 
 class TestStoragePath(unittest.TestCase):
     '''
@@ -67,6 +112,221 @@ class TestStoragePath(unittest.TestCase):
         self.assertIn(path_format, storagepath.get_pictures_dir())
         self.assertIn(path_format, storagepath.get_application_dir())
 
+    @PlatformTest('linux')
+    def test_storagepath_linux_user_dirs(self):
+        '''
+        Test Linux user directories from $XDG_CONFIG_HOME/user-dirs.dirs.
+        '''
+        storagepath = platform_import(
+            platform='linux',
+            module_name='storagepath'
+        )
+
+        with TemporaryDirectory() as home, \
+                patch.dict('os.environ', {
+                    'HOME': home, 'XDG_CONFIG_HOME': join(home, 'conf')
+                }), \
+                patch.object(storagepath.UserDirs, 'recheck_interval', 0):
+            path = storagepath.instance()
+            self.assertEqual(
+                path.get_documents_dir(), join(home, 'Documents')
+            )
+
+            user_dirs = join(home, 'conf', 'user-dirs.dirs')
+            mkdir(join(home, 'conf'))
+            with open(user_dirs, 'w') as fle:
+                fle.write(USER_DIRS)
+            utime(user_dirs, ns=(1, 1))
+
+            all_dirs = path.get_all_dirs()
+            self.assertEqual(all_dirs['desktop'], home)
+            self.assertEqual(
+                path.get_documents_dir(), join(home, 'My "Documents"')
+            )
+            self.assertEqual(path.get_downloads_dir(), '/data/Down\\loads')
+            # relative paths are invalid
+            self.assertEqual(path.get_music_dir(), join(home, 'Music'))
+            self.assertEqual(path.get_pictures_dir(), join(home, '$Pictures'))
+            self.assertEqual(
+                path.get_videos_dir(), join(home, 'Videos and films')
+            )
+            self.assertEqual(all_dirs['projects'], join(home, 'Projects'))
+            self.assertEqual(all_dirs['templates'], join(home, 'Templates'))
+
+            # parsed again only after a change
+            with patch.object(storagepath, 'parse_user_dirs') as parse:
+                path.get_pictures_dir()
+                parse.assert_not_called()
+
+            with open(user_dirs, 'w') as fle:
+                fle.write('XDG_PICTURES_DIR="/srv/pictures"\n')
+            self.assertEqual(path.get_pictures_dir(), '/srv/pictures')
+            self.assertEqual(path.get_documents_dir(), join(home, 'Documents'))
+
+    @PlatformTest('linux')
+    def test_storagepath_linux_base_dirs(self):
+        '''
+        Test Linux XDG base directories and filesystem capacity.
+        '''
+        storagepath = platform_import(
+            platform='linux',
+            module_name='storagepath'
+        )
+        path = storagepath.instance()
+
+        with patch.dict('os.environ', {
+            'HOME': '/home/user', 'XDG_CACHE_HOME': '/fast/cache',
+            'XDG_STATE_HOME': 'relative', 'XDG_RUNTIME_DIR': '/run/user/7'
+        }):
+            environ.pop('XDG_DATA_HOME', None)
+            environ.pop('XDG_CONFIG_HOME', None)
+            self.assertEqual(path.get_cache_dir(), '/fast/cache')
+            self.assertEqual(path.get_config_dir(), '/home/user/.config')
+            self.assertEqual(path.get_data_dir(), '/home/user/.local/share')
+            self.assertEqual(
+                path.get_state_dir(), '/home/user/.local/state'
+            )
+            self.assertEqual(path.get_runtime_dir(), '/run/user/7')
+
+        stat = Mock(f_frsize=4096, f_blocks=1000, f_bfree=300, f_bavail=200)
+        with patch('os.statvfs', return_value=stat) as statvfs, \
+                patch.object(storagepath.LinuxStoragePath, '_capacities', {}):
+            capacity = path.get_capacity('/fast/cache')
+            self.assertEqual(capacity, {
+                'total': 4096000, 'free': 1228800, 'available': 819200
+            })
+            capacity['total'] = 0
+            self.assertEqual(
+                path.get_capacity('/fast/cache')['total'], 4096000
+            )
+            statvfs.assert_called_once_with('/fast/cache')
+
+            with patch.object(path, 'capacity_ttl', 0):
+                path.get_capacity('/fast/cache')
+            self.assertEqual(statvfs.call_count, 2)
+
+    @PlatformTest('linux')
+    def test_storagepath_linux_removable(self):
+        '''
+        Test Linux removable volumes from mountinfo and sysfs.
+        '''
+        storagepath = platform_import(
+            platform='linux',
+            module_name='storagepath'
+        )
+
+        with TemporaryDirectory() as temp:
+            make_block_device(temp, '8:1', 'pci/ata1/block/sda', '0')
+            make_block_device(temp, '8:17', 'pci/usb1/block/sdb', '0')
+            make_block_device(temp, '179:1', 'mmc/block/mmcblk0', '1')
+            make_block_device(temp, '7:0', 'virtual/block/loop0', '0', False)
+            mountinfo = join(temp, 'mountinfo')
+            with open(mountinfo, 'w') as fle:
+                fle.write(MOUNTINFO)
+
+            table = storagepath.MountTable(mountinfo, temp)
+            volumes = table.volumes()
+            self.assertEqual(volumes, [{
+                'device_number': (8, 17), 'root': '/',
+                'path': '/media/user/My Disk', 'fstype': 'vfat',
+                'device': '/dev/sdb1', 'read_only': False
+            }, {
+                'device_number': (179, 1), 'root': '/',
+                'path': '/media/user/card', 'fstype': 'exfat',
+                'device': '/dev/mmcblk0p1', 'read_only': True
+            }])
+
+            # parsed again only after the kernel reports a change
+            with patch.object(storagepath, 'parse_mountinfo') as parse:
+                self.assertEqual(table.volumes(), volumes)
+                parse.assert_not_called()
+
+                table._poller = Mock(poll=Mock(return_value=[
+                    (table._fd, select.POLLIN | select.POLLPRI)
+                ]))
+                parse.return_value = []
+                self.assertEqual(table.volumes(), [])
+                parse.assert_called_once_with(MOUNTINFO)
+
+            self.assertFalse(table.wait(0))
+
+            # the external storage dir doesn't depend on the mount table
+            path = storagepath.instance()
+            with patch.object(path, '_mount_table', table), \
+                    patch.object(path, '_get_home_dir',
+                                 return_value='/home/user'):
+                table._poller.poll.return_value = []
+                self.assertEqual(path.get_removable_volumes(), [])
+                self.assertEqual(
+                    path.get_external_storage_dir(), '/media/user'
+                )
+
+        # the real mount table of the process
+        table = storagepath.MountTable()
+        self.assertIsInstance(table.volumes(), list)
+        self.assertFalse(table.wait(0))
+
+    @PlatformTest('linux')
+    def test_storagepath_linux_usage(self):
+        '''
+        Test Linux directory tree usage with hard links and rescans.
+        '''
+        storagepath = platform_import(
+            platform='linux',
+            module_name='storagepath'
+        )
+        scanner = storagepath.UsageScanner(workers=4)
+
+        with TemporaryDirectory() as temp:
+            for index in range(10):
+                makedirs(join(temp, 'dir{}'.format(index), 'sub'))
+                for name in ('a', join('sub', 'b')):
+                    path = join(temp, 'dir{}'.format(index), name)
+                    with open(path, 'wb') as fle:
+                        fle.write(b'x' * 100)
+            link(join(temp, 'dir0', 'a'), join(temp, 'dir1', 'link'))
+            symlink(join(temp, 'dir0'), join(temp, 'dir2', 'symlink'))
+
+            progress = []
+            usage = scanner.usage(temp, progress.append)
+            symlink_size = len(join(temp, 'dir0').encode())
+            self.assertEqual(usage['files'], 21)
+            self.assertEqual(usage['dirs'], 21)
+            self.assertEqual(usage['size'], 2000 + symlink_size)
+            self.assertEqual(usage['errors'], 0)
+            self.assertEqual(progress[-1], usage)
+            self.assertEqual(progress[0]['dirs'], 1)
+
+            # only the changed directory is read again
+            with open(join(temp, 'dir3', 'sub', 'c'), 'wb') as fle:
+                fle.write(b'x' * 50)
+            with patch('os.scandir', side_effect=scandir) as scan:
+                usage = scanner.usage(temp)
+            scan.assert_called_once_with(join(temp, 'dir3', 'sub'))
+            self.assertEqual(usage['files'], 22)
+            self.assertEqual(usage['size'], 2050 + symlink_size)
+
+            # removed directories are dropped from the cache
+            rmtree(join(temp, 'dir4'))
+            self.assertEqual(scanner.usage(temp)['dirs'], 19)
+            self.assertEqual(len(scanner._cache), 19)
+            self.assertNotIn(join(temp, 'dir4', 'sub'), scanner._cache)
+
+            # the least recently scanned directories are dropped first
+            scanner.cache_size = 5
+            scanner.usage(join(temp, 'dir5'))
+            scanner.usage(join(temp, 'dir6'))
+            self.assertEqual(list(scanner._cache)[-4:], [
+                join(temp, 'dir5'), join(temp, 'dir5', 'sub'),
+                join(temp, 'dir6'), join(temp, 'dir6', 'sub')
+            ])
+            self.assertEqual(len(scanner._cache), 5)
+
+            path = storagepath.instance()
+            self.assertEqual(
+                path.usage(join(temp, 'dir0', 'a'))['size'], 100
+            )
+
 
 if __name__ == '__main__':
     unittest.main()
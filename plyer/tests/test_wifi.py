@@ -0,0 +1,387 @@
+'''
+TestWifi
+========
+
+Tested platforms:
+
+* Linux - nmcli
+'''
+
+import unittest
+import sys
+
+from os import mkdir
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from threading import Barrier, Event
+from time import monotonic, sleep
+from unittest.mock import MagicMock, Mock, patch
+
+from plyer.tests.common import (
+    PlatformTest, platform_import, imported_modules
+)
+
+
+def escape_terse(value):
+    '''
+    Escape a value the same way as nmcli does in terse mode.
+    '''
+    return value.replace('\\', '\\\\').replace(':', '\\:')
+
+
+def access_points(count):
+    '''
+    Generate field values for `count` access points with SSIDs
+    that contain characters nmcli has to escape.
+    '''
+    ssids = ('plyer', 'cash$$', 'back\\slash', 'co:lon', 'all\\:$$:\\')
+    for idx in range(count):
+        yield (
+            '{}-{}'.format(ssids[idx % len(ssids)], idx),
+            ':'.join('{:02X}'.format(byte) for byte in idx.to_bytes(6, 'big')),
+            'Infra', str(idx % 13 + 1), '2412 MHz',
+            '\u2582\u2584__', '54 Mbit/s', str(idx % 100), 'WPA2',
+            'wlan{}'.format(idx % 2)
+        )
+
+
+PROC_WIRELESS = (
+    'Inter-| sta-|   Quality        |   Discarded packets'
+    '               | Missed | WE\n'
+    ' face | tus | link level noise |  nwid  crypt   frag  retry   misc'
+    ' | beacon | 22\n'
+    '  eth9: 0000   70.  -40.  -95.        0      0      0      0'
+    '      0        0\n'
+    ' wlan0: 0000   {link}.  {level}.  -256        0      0      0      0'
+    '     17        0\n'
+)
+
+
+def import_linux_wifi():
+    '''
+    Import Linux wifi module with mocked python-wifi package.
+    '''
+    with patch.dict(sys.modules, {'wifi': Mock()}):
+        return platform_import(
+            platform='linux',
+            module_name='wifi'
+        )
+
+
+class TestWifi(unittest.TestCase):
+    '''
+    TestCase for plyer.wifi.
+    '''
+
+    @PlatformTest('linux')
+    def test_import_cost(self):
+        '''
+        Test python-wifi is imported only by the deprecated backend.
+        '''
+        modules = imported_modules(
+            'from plyer.platforms.linux import wifi\n'
+            'wifi.NMCLIWifi()',
+            stubs=['wifi']
+        )
+        self.assertIn('plyer.platforms.linux.wifi', modules)
+        self.assertNotIn('wifi', modules)
+
+    @PlatformTest('linux')
+    def test_scanning_async_coalesce(self):
+        '''
+        Test concurrent async scans share a single nmcli rescan.
+        '''
+        module = import_linux_wifi()
+        wifi = module.NMCLIWifi()
+        release = Event()
+        networks = {'plyer': {'SSID': 'plyer'}}
+
+        def scan(interface):
+            release.wait(5)
+            return networks
+
+        with patch.object(wifi, '_scan', side_effect=scan) as mocked, \
+                patch.object(module.NMCLIWifi, 'interfaces', ['wlan0']), \
+                patch.object(wifi, '_is_enabled', return_value=True):
+            first = wifi.start_scanning_async()
+            # the default interface by its name shares the scan too
+            second = wifi.start_scanning_async('wlan0')
+            self.assertIs(first, second)
+            release.set()
+            self.assertEqual(first.result(5), networks)
+
+            # within min_rescan_interval the previous result is reused,
+            # by the blocking scan as well
+            third = wifi.start_scanning_async()
+            self.assertTrue(third.done())
+            self.assertEqual(third.result(), networks)
+            wifi.start_scanning()
+            mocked.assert_called_once_with('wlan0')
+
+            # after the interval elapses the interface is rescanned
+            wifi.min_rescan_interval = 0
+            self.assertEqual(wifi.start_scanning_async().result(5), networks)
+            self.assertEqual(mocked.call_count, 2)
+
+        self.assertEqual(wifi.names, networks)
+
+    @PlatformTest('linux')
+    def test_scanning_async_callback(self):
+        '''
+        Test the callback receives the finished future, errors included.
+        '''
+        wifi = import_linux_wifi().NMCLIWifi()
+        called = Event()
+        callback = Mock(side_effect=lambda future: called.set())
+
+        with patch.object(wifi, '_scan', side_effect=OSError('no nmcli')):
+            future = wifi.start_scanning_async('wlan0', callback=callback)
+            self.assertRaises(OSError, future.result, 5)
+            self.assertRaises(OSError, wifi.start_scanning, 'wlan0')
+
+        self.assertTrue(called.wait(5))
+        callback.assert_called_once_with(future)
+        self.assertEqual(wifi.names, {})
+
+    @PlatformTest('linux')
+    def test_scanning_all_interfaces(self):
+        '''
+        Test scanning with all interfaces at once merged by BSSID.
+        '''
+        module = import_linux_wifi()
+        wifi = module.NMCLIWifi()
+        record = module.parse_terse
+        fields = wifi.scan_fields
+        lines = {
+            'wlan0': [
+                'shared:00\\:01:Infra:1:2412 MHz:__:54 Mbit/s:40:WPA2:wlan0',
+                'first:00\\:02:Infra:1:2412 MHz:__:54 Mbit/s:70:WPA2:wlan0',
+            ],
+            'wlan1': [
+                'shared:00\\:01:Infra:1:2412 MHz:__:54 Mbit/s:80:WPA2:wlan1',
+                'second:00\\:03:Infra:6:2437 MHz:__:54 Mbit/s:50:WPA2:wlan1',
+            ],
+        }
+        release = Barrier(2, timeout=5)
+
+        def scan_interface(interface):
+            # both radios have to be scanning at the same time
+            release.wait()
+            return list(record(lines[interface], fields))
+
+        with patch.multiple(
+                wifi, _is_enabled=Mock(return_value=True),
+                _scan_interface=Mock(side_effect=scan_interface)):
+            with patch.object(
+                    module.NMCLIWifi, 'interfaces', ['wlan0', 'wlan1']):
+                wifi.start_scanning(interface='all')
+
+        self.assertEqual(
+            sorted(wifi.bssids), ['00:01', '00:02', '00:03']
+        )
+        self.assertEqual(wifi.bssids['00:01'].DEVICE, 'wlan1')
+        self.assertEqual(wifi.bssids['00:02'].DEVICE, 'wlan0')
+        self.assertEqual(wifi.names['shared']['SIGNAL'], '80')
+        self.assertEqual(wifi.names['shared']['BSSID'], '00:01')
+        self.assertEqual(
+            sorted(wifi.get_available_wifi()), ['first', 'second', 'shared']
+        )
+
+    @PlatformTest('linux')
+    def test_link_monitor(self):
+        '''
+        Test sampling of the link quality from a fake procfs.
+        '''
+        module = import_linux_wifi()
+        crossed = []
+
+        with TemporaryDirectory() as temp:
+            proc = join(temp, 'wireless')
+            mkdir(join(temp, 'wlan0'))
+            with open(join(temp, 'wlan0', 'operstate'), 'w') as fle:
+                fle.write('up\n')
+
+            monitor = module.WifiLinkMonitor('wlan0', size=2)
+            monitor.proc_path = proc
+            monitor.sysfs_path = temp
+            monitor.add_threshold(
+                'level', -70,
+                lambda *args: crossed.append(args[1:])
+            )
+
+            try:
+                for link, level in ((54, -56), (20, -80), (60, -50)):
+                    with open(proc, 'w') as fle:
+                        fle.write(PROC_WIRELESS.format(link=link, level=level))
+                    sample = monitor.sample()
+            finally:
+                monitor.stop()
+
+        self.assertTrue(sample.up)
+        self.assertEqual((sample.link, sample.level), (60, -50))
+        self.assertIsNone(sample.noise)
+        self.assertEqual(len(monitor.samples), 2)
+        self.assertEqual(monitor.samples[0].level, -80)
+        self.assertEqual(crossed, [
+            ('level', -70, False), ('level', -70, True)
+        ])
+
+    @PlatformTest('linux')
+    def test_link_monitor_missing(self):
+        '''
+        Test the monitor thread survives a removed interface.
+        '''
+        module = import_linux_wifi()
+
+        with TemporaryDirectory() as temp:
+            proc = join(temp, 'wireless')
+            with open(proc, 'w') as fle:
+                fle.write(PROC_WIRELESS.format(link=54, level=-56))
+
+            monitor = module.WifiLinkMonitor('wlan0', rate=100)
+            monitor.proc_path = proc
+            monitor.sysfs_path = temp
+            monitor.start()
+            try:
+                start = monotonic()
+                while not monitor.samples:
+                    self.assertLess(monotonic() - start, 5)
+                    sleep(0.01)
+                self.assertIsInstance(monitor.error, OSError)
+                self.assertEqual(
+                    monitor.samples[0][1:], (False, None, None, None)
+                )
+
+                # sampled again once the interface is back
+                mkdir(join(temp, 'wlan0'))
+                with open(join(temp, 'wlan0', 'operstate'), 'w') as fle:
+                    fle.write('up\n')
+                while not monitor.samples[-1].up or monitor.error:
+                    self.assertLess(monotonic() - start, 5)
+                    sleep(0.01)
+                self.assertEqual(monitor.samples[-1].level, -56)
+                self.assertIsNone(monitor.error)
+            finally:
+                monitor.stop()
+
+    @PlatformTest('linux')
+    def test_connect_saved_profile(self):
+        '''
+        Test connecting reuses a saved profile and falls back to
+        a full connect.
+        '''
+        module = import_linux_wifi()
+        wifi = module.NMCLIWifi()
+        outputs = {
+            ('connection', 'show'): [
+                'a1b2:802-11-wireless\n', 'c3d4:802-3-ethernet\n',
+                'e5f6:802-11-wireless\n',
+            ],
+            ('connection', 'show', 'a1b2', 'e5f6'): [
+                'connection.uuid:a1b2\n', '802-11-wireless.ssid:home\n',
+                'connection.uuid:e5f6\n', '802-11-wireless.ssid:of\\:fice\n',
+            ],
+        }
+
+        def popen(args, **kwargs):
+            proc = MagicMock()
+            proc.stdout = outputs[tuple(args[4:])]
+            return proc
+
+        call = Mock(return_value=0)
+        with patch.multiple(module, Popen=popen, call=call), \
+                patch.object(wifi, '_enable'):
+            wifi.connect('of:fice', {}, interface='wlan0')
+            call.assert_called_with([
+                'nmcli', 'connection', 'up', 'uuid', 'e5f6',
+                'ifname', 'wlan0'
+            ])
+            self.assertEqual(wifi._get_profiles(), {
+                'home': 'a1b2', 'of:fice': 'e5f6'
+            })
+
+            # failed activation falls back to the full connect
+            call.side_effect = (1, 0)
+            wifi.connect('home', {'password': 'secret'}, interface='wlan0')
+            call.assert_called_with([
+                'nmcli', 'device', 'wifi', 'connect', 'home',
+                'ifname', 'wlan0', 'password', 'secret'
+            ])
+            self.assertIsNone(wifi._profiles)
+
+            # unknown network goes straight to the full connect
+            call.reset_mock(side_effect=True)
+            wifi.connect('cafe', {}, interface='wlan0')
+            call.assert_called_once_with([
+                'nmcli', 'device', 'wifi', 'connect', 'cafe',
+                'ifname', 'wlan0'
+            ])
+
+    @PlatformTest('linux')
+    def test_parse_terse(self):
+        '''
+        Test parsing of escaped nmcli terse output for many networks.
+        '''
+        wifi = import_linux_wifi()
+        fields = wifi.NMCLIWifi.scan_fields
+        expected = list(access_points(1200))
+        output = '\n'.join(
+            ':'.join(escape_terse(value) for value in values)
+            for values in expected
+        ) + '\n'
+
+        records = list(wifi.parse_terse(output.splitlines(True), fields))
+        self.assertEqual([tuple(record) for record in records], expected)
+        self.assertEqual(records[3].SSID, 'co:lon-3')
+        self.assertEqual(records[4].SSID, 'all\\:$$:\\-4')
+        self.assertEqual(records[1].BSSID, '00:00:00:00:00:01')
+
+        # malformed lines are skipped
+        records = wifi.parse_terse(['a:b', 'wlan0:wifi'], ('DEVICE', 'TYPE'))
+        self.assertEqual([tuple(record) for record in records], [
+            ('a', 'b'), ('wlan0', 'wifi')
+        ])
+        self.assertEqual(list(wifi.parse_terse(['x:y:z'], ('A', 'B'))), [])
+
+    @PlatformTest('linux')
+    def test_parse_multiline(self):
+        '''
+        Test parsing of escaped nmcli multiline output.
+        '''
+        wifi = import_linux_wifi()
+        fields = ('IN-USE', 'SSID', 'BSSID')
+        output = [
+            'IN-USE:*', 'SSID:co\\:lon',
+            'BSSID:00\\:11\\:22\\:33\\:44\\:55',
+            'IN-USE:', 'SSID:back\\\\slash',
+            'BSSID:66\\:77\\:88\\:99\\:AA\\:BB',
+        ]
+        records = list(wifi.parse_multiline(output, fields))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0].IN_USE, '*')
+        self.assertEqual(records[0].SSID, 'co:lon')
+        self.assertEqual(records[1].SSID, 'back\\slash')
+        self.assertEqual(records[1].BSSID, '66:77:88:99:AA:BB')
+
+    @PlatformTest('linux')
+    def test_network_info(self):
+        '''
+        Test network info built from a parsed nmcli record.
+        '''
+        module = import_linux_wifi()
+        wifi = module.NMCLIWifi()
+        values = next(access_points(1))
+        line = ':'.join(escape_terse(value) for value in values)
+        network, = module.parse_terse([line], wifi.scan_fields)
+        wifi.names[network.SSID] = network._asdict()
+
+        info = wifi.get_network_info('plyer-0')
+        self.assertEqual(info['address'], '00:00:00:00:00:00')
+        self.assertEqual(info['channel'], 1)
+        self.assertEqual(info['quality'], '80.0/100')
+        self.assertEqual(info['encryption_type'], 'wpa2')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ Utils
 '''
 __all__ = ('platform', 'reify', 'deprecated')
 
+from importlib.util import find_spec
 from os import environ
 from os import path
 from sys import platform as _sys_platform
@@ -151,6 +152,19 @@ def whereis_exe(program):
     return None
 
 
+def module_available(name):
+    '''
+    Check whether a module can be imported without actually importing it,
+    so that optional dependencies are loaded only by the backend using them.
+    '''
+    if name in sys.modules:
+        return True
+    try:
+        return find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
 class reify:
     '''
     Put the result of a method which uses this (non-data) descriptor decorator
@@ -40,6 +40,7 @@ PACKAGES = [
     'plyer.facades',
     'plyer.platforms',
     'plyer.platforms.linux',
+    'plyer.platforms.linux.libs',
     'plyer.platforms.android',
     'plyer.platforms.win',
     'plyer.platforms.win.libs',